@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import bisect
+import hashlib
 import json
 import os
+import re
 from typing import Any, Literal
 
 import httpx
@@ -12,12 +15,30 @@ mcp = FastMCP("openapi-local")
 
 _OPENAPI_CACHE: dict[str, Any] | None = None
 _OPENAPI_SOURCE: str | None = None
+# (mtime_ns, size) of a local-file source, so edits are picked up without an explicit reload.
+_OPENAPI_STAMP: tuple[int, int] | None = None
+_OPENAPI_INDEX: _OperationIndex | None = None
+
+_HTTP_METHODS = {"get", "post", "put", "patch", "delete", "head", "options"}
+_TOKEN_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+# Relative weight of a token by the field it came from when ranking search results.
+_FIELD_WEIGHTS = {"operationId": 3.0, "path": 2.0, "tags": 2.0, "summary": 1.0}
 
 
 def _default_source() -> str:
     return os.getenv("SIRVIST_OPENAPI_SOURCE", "http://localhost:8001/openapi.json")
 
 
+def _local_stamp(source: str) -> tuple[int, int] | None:
+    if source.startswith("http://") or source.startswith("https://"):
+        return None
+    try:
+        st = os.stat(source)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
 def _load_openapi_from_source(source: str) -> dict[str, Any]:
     source = source.strip()
     if not source:
@@ -42,21 +63,165 @@ def _load_openapi_from_source(source: str) -> dict[str, Any]:
 
 
 def _ensure_loaded(source: str | None = None) -> dict[str, Any]:
-    global _OPENAPI_CACHE, _OPENAPI_SOURCE
+    global _OPENAPI_CACHE, _OPENAPI_SOURCE, _OPENAPI_STAMP
     src = (source or _default_source()).strip()
-    if _OPENAPI_CACHE is None or src != _OPENAPI_SOURCE:
+    stamp = _local_stamp(src)
+    if _OPENAPI_CACHE is None or src != _OPENAPI_SOURCE or stamp != _OPENAPI_STAMP:
         _OPENAPI_CACHE = _load_openapi_from_source(src)
         _OPENAPI_SOURCE = src
+        _OPENAPI_STAMP = stamp
     return _OPENAPI_CACHE
 
 
+def _ensure_index(source: str | None = None) -> _OperationIndex:
+    """Return the operation index for the current spec, recompiling only if its content changed."""
+    global _OPENAPI_INDEX
+    spec = _ensure_loaded(source)
+    if _OPENAPI_INDEX is not None and _OPENAPI_INDEX.spec is spec:
+        return _OPENAPI_INDEX
+    # The spec was (re)loaded: hash it once so an unchanged document keeps its compiled index.
+    digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+    if _OPENAPI_INDEX is None or _OPENAPI_INDEX.digest != digest:
+        _OPENAPI_INDEX = _OperationIndex(_iter_operations(spec), digest)
+    _OPENAPI_INDEX.spec = spec
+    return _OPENAPI_INDEX
+
+
+def _tokens(text: str) -> list[str]:
+    # camelCase, snake_case, kebab-case and path segments: "getPatent_by-id" -> get/patent/by/id.
+    return [t.lower() for t in _TOKEN_RE.findall(text or "")]
+
+
+class _OperationIndex:
+    """
+    Operations of one spec, compiled for lookup by method, tag, path prefix and tokens.
+
+    The inverted index maps each token from path segments, operationId, summary and tags to the
+    operations containing it, weighted by field. Query words of three or more letters also match
+    index tokens by prefix (the vocabulary is sorted, so that is a bisect plus a short scan).
+    Literal substring matches are narrowed through a character-trigram index before checking.
+    """
+
+    def __init__(self, ops: list[dict[str, Any]], digest: str) -> None:
+        self.ops = ops
+        self.digest = digest
+        self.spec: dict[str, Any] | None = None
+        self.by_method: dict[str, set[int]] = {}
+        self.by_tag: dict[str, set[int]] = {}
+        self.postings: dict[str, dict[int, float]] = {}
+        self.haystacks: list[str] = []
+        self.trigrams: dict[str, set[int]] = {}
+        for i, op in enumerate(ops):
+            self.by_method.setdefault(op["method"], set()).add(i)
+            for tag in op["tags"]:
+                self.by_tag.setdefault(str(tag).lower(), set()).add(i)
+            fields = {
+                "operationId": op.get("operationId") or "",
+                "path": op["path"],
+                "tags": " ".join(str(t) for t in op["tags"]),
+                "summary": op.get("summary") or "",
+            }
+            for field, text in fields.items():
+                for token in set(_tokens(text)):
+                    posting = self.postings.setdefault(token, {})
+                    posting[i] = posting.get(i, 0.0) + _FIELD_WEIGHTS[field]
+            # NUL-joined so a literal match cannot span two fields (needles never contain NUL).
+            haystack = "\x00".join((op["path"], fields["operationId"], fields["summary"])).lower()
+            self.haystacks.append(haystack)
+            for j in range(len(haystack) - 2):
+                gram = haystack[j : j + 3]
+                if "\x00" not in gram:
+                    self.trigrams.setdefault(gram, set()).add(i)
+        self.vocabulary = sorted(self.postings)
+        self.paths = sorted((op["path"], i) for i, op in enumerate(ops))
+
+    def with_path_prefix(self, prefix: str) -> set[int]:
+        start = bisect.bisect_left(self.paths, (prefix,))
+        out: set[int] = set()
+        for path, i in self.paths[start:]:
+            if not path.startswith(prefix):
+                break
+            out.add(i)
+        return out
+
+    def _literal_candidates(self, needle: str) -> set[int]:
+        # An operation containing `needle` contains every trigram of it; intersecting rarest
+        # first leaves a handful of haystacks for the substring check.
+        postings = sorted(
+            (self.trigrams.get(needle[j : j + 3], set()) for j in range(len(needle) - 2)),
+            key=len,
+        )
+        out = set(postings[0])
+        for posting in postings[1:]:
+            if not out:
+                break
+            out &= posting
+        return out
+
+    def _token_scores(self, token: str) -> dict[int, float]:
+        if len(token) < 3 or token.isdigit():
+            # Short and numeric tokens ("v1", "19") only match exactly, or "19" would hit "190".
+            return dict(self.postings.get(token, {}))
+        scores: dict[int, float] = {}
+        start = bisect.bisect_left(self.vocabulary, token)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(token):
+                break
+            # Exact token matches outrank prefix matches.
+            factor = 1.0 if word == token else 0.5
+            for i, weight in self.postings[word].items():
+                scores[i] = max(scores.get(i, 0.0), weight * factor)
+        return scores
+
+    def search(
+        self,
+        *,
+        contains: str | None = None,
+        method: str | None = None,
+        tag: str | None = None,
+        path_prefix: str | None = None,
+    ) -> list[tuple[int, float | None]]:
+        """Return (operation index, score) pairs, best first; score is None without `contains`."""
+        candidates: set[int] | None = None
+        for subset in (
+            self.by_method.get(method.strip().lower(), set()) if method else None,
+            self.by_tag.get(tag.strip().lower(), set()) if tag else None,
+            self.with_path_prefix(path_prefix.strip()) if path_prefix else None,
+        ):
+            if subset is not None:
+                candidates = subset if candidates is None else candidates & subset
+        pool = range(len(self.ops)) if candidates is None else sorted(candidates)
+
+        needle = (contains or "").replace("\x00", "").strip().lower()
+        if not needle:
+            return [(i, None) for i in pool]
+        scores: dict[int, float] | None = None
+        for token in _tokens(needle):
+            token_scores = self._token_scores(token)
+            if scores is None:
+                scores = {i: token_scores[i] for i in pool if i in token_scores}
+            else:
+                scores = {i: s + token_scores[i] for i, s in scores.items() if i in token_scores}
+        scores = scores or {}
+        # Literal substrings (e.g. "/v1/us" or a partial word) still match, as before indexing.
+        # Needles shorter than a trigram are checked against the whole pool.
+        literal = pool
+        if len(needle) >= 3:
+            found = self._literal_candidates(needle)
+            literal = sorted(found if candidates is None else found & candidates)
+        for i in literal:
+            if needle in self.haystacks[i]:
+                scores[i] = scores.get(i, 0.0) + 1.0
+        return sorted(((i, round(s, 2)) for i, s in scores.items()), key=lambda x: (-x[1], x[0]))
+
+
 def _iter_operations(spec: dict[str, Any]) -> list[dict[str, Any]]:
     ops: list[dict[str, Any]] = []
     for path, path_item in (spec.get("paths") or {}).items():
         if not isinstance(path_item, dict):
             continue
         for method, operation in path_item.items():
-            if method.lower() not in {"get", "post", "put", "patch", "delete", "head", "options"}:
+            if method.lower() not in _HTTP_METHODS:
                 continue
             if not isinstance(operation, dict):
                 continue
@@ -83,13 +248,18 @@ def openapi_reload(*, source: str | None = None) -> dict[str, Any]:
     global _OPENAPI_CACHE, _OPENAPI_SOURCE
     _OPENAPI_CACHE = None
     _OPENAPI_SOURCE = None
-    spec = _ensure_loaded(source)
+    previous = _OPENAPI_INDEX
+    index = _ensure_index(source)
+    spec = _OPENAPI_CACHE or {}
     return {
         "source": _OPENAPI_SOURCE,
         "openapi": spec.get("openapi"),
         "title": ((spec.get("info") or {}).get("title")),
         "version": ((spec.get("info") or {}).get("version")),
         "paths": len((spec.get("paths") or {}).keys()),
+        "operations": len(index.ops),
+        # False when the reloaded spec is identical and the existing index was kept.
+        "index_rebuilt": index is not previous,
     }
 
 
@@ -99,28 +269,28 @@ def openapi_list_endpoints(
     source: str | None = None,
     contains: str | None = None,
     method: str | None = None,
+    tag: str | None = None,
+    path_prefix: str | None = None,
     limit: int = 50,
 ) -> dict[str, Any]:
-    """List endpoints from a local OpenAPI schema (bounded output)."""
-    spec = _ensure_loaded(source)
-    ops = _iter_operations(spec)
-
-    if method:
-        m = method.strip().lower()
-        ops = [o for o in ops if o["method"] == m]
-    if contains:
-        needle = contains.strip().lower()
-        if needle:
-            ops = [
-                o
-                for o in ops
-                if needle in (o.get("path") or "").lower()
-                or needle in (o.get("operationId") or "").lower()
-                or needle in (o.get("summary") or "").lower()
-            ]
+    """
+    List endpoints from a local OpenAPI schema (bounded output).
+
+    `contains` is matched word-by-word (prefixes too) against path segments, operationId,
+    summary and tags, and results are ranked by relevance; `method`, `tag` and `path_prefix`
+    filter exactly.
+    """
+    index = _ensure_index(source)
+    hits = index.search(contains=contains, method=method, tag=tag, path_prefix=path_prefix)
 
     limit = max(1, min(int(limit), 200))
-    return {"source": _OPENAPI_SOURCE, "count": len(ops), "items": ops[:limit]}
+    items = []
+    for i, score in hits[:limit]:
+        item = dict(index.ops[i])
+        if score is not None:
+            item["score"] = score
+        items.append(item)
+    return {"source": _OPENAPI_SOURCE, "count": len(hits), "items": items}
 
 
 @mcp.tool()
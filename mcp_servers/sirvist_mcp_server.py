@@ -1,22 +1,43 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import contextlib
+import contextvars
+import functools
+import hashlib
 import html
+import importlib.util
 import json
+import logging
+import logging.handlers
 import os
+import queue
+import random
 import re
+import secrets
+import sqlite3
 import subprocess
+import threading
 import time
-import urllib.error
-import urllib.request
+from collections import OrderedDict, deque
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
-from fastmcp import FastMCP
-from neo4j import GraphDatabase
+import httpx
+import numpy as np
+from fastmcp import Context, FastMCP
+from neo4j import READ_ACCESS, WRITE_ACCESS, GraphDatabase
 
-from paths import bifrost_allowlists_dir, env_example_path, env_path
+from paths import bifrost_allowlists_dir, env_example_path, env_path, state_dir
 from paths import repo_root as repo_root_path
 
+logger = logging.getLogger("sirvist.mcp")
+
 
 def _load_kv_file(path: Path) -> dict[str, str]:
     data: dict[str, str] = {}
@@ -31,56 +52,268 @@ def _load_kv_file(path: Path) -> dict[str, str]:
     return data
 
 
-def _load_repo_env(repo_root: Path) -> dict[str, str]:
+def _load_json_list(path: Path) -> set[str]:
+    """Parse a JSON list of strings; raises ValueError/OSError if the file is not one."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, list):
+        raise ValueError(f"{path.name} must contain a JSON list")
+    return {str(x).strip() for x in data if str(x).strip()}
+
+
+class _RepoConfig:
     """
-    Load environment key-values from repo files (secret-free defaults first, then .env overrides).
+    Repo env files and Bifrost model allowlists, parsed once and re-read only when a file changes.
 
-    Precedence within this helper:
-      1) .env.example  (documented defaults; secret-free)
-      2) .env          (local overrides; may contain secrets)
+    Env files are merged in order, later files overriding earlier ones (`.env.example` holds the
+    secret-free defaults, `.env` the local overrides). Allowlists are every `*_models.json` under
+    the allowlist dir, grouped by the provider named just before `_models` (e.g.
+    `us_central1_vertex_models.json` -> vertex).
+
+    Files are re-stat'ed at most every `check_interval_s`; a changed (mtime, size) stamp triggers a
+    re-parse, and subscribers are called with the changed keys only when one of their keys moved.
+    Callbacks run on a dedicated notifier thread, never inside the caller that noticed the change,
+    so a subscriber may take locks its callers already hold while reading config.
+    An allowlist file that fails to parse keeps its last good contents (a half-written file must
+    not widen or wipe the allowlist). Values read once at import (pool sizes, cache paths) still
+    need a restart.
     """
-    env: dict[str, str] = {}
-    env.update(_load_kv_file(env_example_path()))
-    env.update(_load_kv_file(env_path()))
-    return env
+
+    def __init__(
+        self, *, env_files: list[Path], allowlist_dir: Path, check_interval_s: float
+    ) -> None:
+        self.env_files = env_files
+        self.allowlist_dir = allowlist_dir
+        self.check_interval_s = max(0.0, float(check_interval_s))
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._env: dict[str, str] = {}
+        self._env_stamp: tuple[Any, ...] | None = None
+        self._allowlists: dict[str, set[str]] = {}
+        self._allowlist_files: dict[Path, set[str]] = {}
+        self._allowlist_stamp: tuple[Any, ...] | None = None
+        self._subscribers: list[tuple[tuple[str, ...], Any]] = []
+        self._notify: queue.SimpleQueue[tuple[Any, set[str]]] = queue.SimpleQueue()
+        self._notifier: threading.Thread | None = None
+        self.revalidate(force=True)
+
+    @staticmethod
+    def _stamp(paths: list[Path]) -> tuple[Any, ...]:
+        out = []
+        for p in paths:
+            try:
+                st = p.stat()
+                out.append((str(p), st.st_mtime_ns, st.st_size))
+            except OSError:
+                out.append((str(p), None, None))
+        return tuple(out)
+
+    def subscribe(self, keys: tuple[str, ...], callback: Any) -> None:
+        """Call `callback(changed_keys)` when any of `keys` changes; `PREFIX*` matches a prefix."""
+        with self._lock:
+            self._subscribers.append((keys, callback))
+            if self._notifier is None:
+                self._notifier = threading.Thread(
+                    target=self._notify_loop, name="sirvist-config-notify", daemon=True
+                )
+                self._notifier.start()
+
+    def _notify_loop(self) -> None:
+        while True:
+            callback, hits = self._notify.get()
+            try:
+                callback(hits)
+            except Exception as exc:
+                logger.warning("Config subscriber %r failed: %s", callback, exc)
+
+    def revalidate(self, *, force: bool = False) -> None:
+        if not force and time.monotonic() - self._checked_at < self.check_interval_s:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.check_interval_s:
+                return
+            self._checked_at = now
+            changed: set[str] = set()
+            reloaded = False
+            env_stamp = self._stamp(self.env_files)
+            if env_stamp != self._env_stamp:
+                reloaded = True
+                env: dict[str, str] = {}
+                for p in self.env_files:
+                    env.update(_load_kv_file(p))
+                changed = {
+                    k for k in env.keys() | self._env.keys() if env.get(k) != self._env.get(k)
+                }
+                self._env = env
+                self._env_stamp = env_stamp
+            files = sorted(self.allowlist_dir.glob("*_models.json"))
+            allowlist_stamp = self._stamp(files)
+            if allowlist_stamp != self._allowlist_stamp:
+                reloaded = True
+                allowlists: dict[str, set[str]] = {}
+                per_file: dict[Path, set[str]] = {}
+                for p in files:
+                    try:
+                        per_file[p] = _load_json_list(p)
+                    except (OSError, ValueError) as exc:
+                        logger.warning("Keeping last good Bifrost allowlist for %s: %s", p, exc)
+                        per_file[p] = self._allowlist_files.get(p, set())
+                    provider = p.stem.removesuffix("_models").rsplit("_", 1)[-1].lower()
+                    allowlists.setdefault(provider, set()).update(per_file[p])
+                self._allowlist_files = per_file
+                self._allowlists = allowlists
+                self._allowlist_stamp = allowlist_stamp
+            self.reloads += int(reloaded)
+            subscribers = list(self._subscribers) if changed else []
+        for keys, callback in subscribers:
+            hits = {
+                k
+                for k in changed
+                if any(k.startswith(p[:-1]) if p.endswith("*") else k == p for p in keys)
+            }
+            if hits:
+                self._notify.put((callback, hits))
+
+    def env(self) -> dict[str, str]:
+        self.revalidate()
+        return self._env
+
+    def allowlists(self) -> dict[str, set[str]]:
+        self.revalidate()
+        return self._allowlists
 
 
 def _repo_root() -> Path:
     return repo_root_path()
 
 
+_NEO4J_DRIVER_LOCK = threading.Lock()
+# "users" counts long-lived holders of a driver (see `_hold_neo4j_driver`); a driver replaced
+# while held is parked in "retired" and closed when its last holder releases it.
+_NEO4J_DRIVER_STATE: dict[str, Any] = {
+    "driver": None,
+    "key": None,
+    "dirty": False,
+    "users": {},
+    "retired": set(),
+}
+
+
+def _neo4j_settings(repo_root: Path) -> dict[str, Any]:
+    env = _REPO_CONFIG.env()
+    return {
+        "uri": env.get("NEO4J_URI", "bolt://localhost:7687"),
+        "user": env.get("NEO4J_USERNAME", env.get("NEO4J_USER", "neo4j")),
+        "password": env.get("NEO4J_PASSWORD", ""),
+        # Pool tuning; see the neo4j driver docs for semantics of each knob.
+        "max_connection_pool_size": _int_env("SIRVIST_NEO4J_POOL_SIZE", 50),
+        "connection_acquisition_timeout": _float_env("SIRVIST_NEO4J_ACQUISITION_TIMEOUT_S", 30.0),
+        "max_connection_lifetime": _float_env("SIRVIST_NEO4J_MAX_LIFETIME_S", 3600.0),
+        "liveness_check_timeout": _float_env("SIRVIST_NEO4J_LIVENESS_CHECK_S", 30.0),
+    }
+
+
 def _neo4j_driver(repo_root: Path):
-    env = _load_repo_env(repo_root)
-    uri = env.get("NEO4J_URI", "bolt://localhost:7687")
-    user = env.get("NEO4J_USERNAME", env.get("NEO4J_USER", "neo4j"))
-    password = env.get("NEO4J_PASSWORD", "")
-    return GraphDatabase.driver(uri, auth=(user, password))
+    """
+    Return the process-wide pooled Neo4j driver, creating it on first use.
 
+    The driver is rebuilt only when the connection settings change (e.g. rotated credentials in
+    `.env`, signalled by `_REPO_CONFIG`); otherwise every tool call reuses the same warm Bolt
+    connection pool. Callers must NOT close the returned driver; `_close_neo4j_driver` runs at
+    interpreter exit.
+    """
+    _REPO_CONFIG.revalidate()
+    with _NEO4J_DRIVER_LOCK:
+        driver = _NEO4J_DRIVER_STATE.get("driver")
+        if driver is not None and not _NEO4J_DRIVER_STATE["dirty"]:
+            return driver
+    settings = _neo4j_settings(repo_root)
+    key = tuple(sorted(settings.items()))
+    with _NEO4J_DRIVER_LOCK:
+        driver = _NEO4J_DRIVER_STATE.get("driver")
+        _NEO4J_DRIVER_STATE["dirty"] = False
+        if driver is not None and _NEO4J_DRIVER_STATE.get("key") == key:
+            return driver
+        stale = driver
+        driver = GraphDatabase.driver(
+            settings["uri"],
+            auth=(settings["user"], settings["password"]),
+            max_connection_pool_size=max(1, settings["max_connection_pool_size"]),
+            connection_acquisition_timeout=settings["connection_acquisition_timeout"],
+            max_connection_lifetime=settings["max_connection_lifetime"],
+            liveness_check_timeout=settings["liveness_check_timeout"],
+        )
+        _NEO4J_DRIVER_STATE["driver"] = driver
+        _NEO4J_DRIVER_STATE["key"] = key
+        if stale is not None and _NEO4J_DRIVER_STATE["users"].get(stale):
+            _NEO4J_DRIVER_STATE["retired"].add(stale)
+            stale = None
+    if stale is not None:
+        with contextlib.suppress(Exception):
+            stale.close()
+    return driver
+
+
+def _hold_neo4j_driver(repo_root: Path):
+    """
+    Return the current driver and keep it open until `_release_neo4j_driver`, even if a settings
+    change swaps in a new one meanwhile. For sessions that outlive a single tool call.
+    """
+    while True:
+        driver = _neo4j_driver(repo_root)
+        with _NEO4J_DRIVER_LOCK:
+            if _NEO4J_DRIVER_STATE.get("driver") is driver:
+                users: dict[Any, int] = _NEO4J_DRIVER_STATE["users"]
+                users[driver] = users.get(driver, 0) + 1
+                return driver
+
+
+def _release_neo4j_driver(driver: Any) -> None:
+    with _NEO4J_DRIVER_LOCK:
+        users: dict[Any, int] = _NEO4J_DRIVER_STATE["users"]
+        users[driver] -= 1
+        if users[driver] > 0:
+            return
+        del users[driver]
+        if driver not in _NEO4J_DRIVER_STATE["retired"]:
+            return
+        _NEO4J_DRIVER_STATE["retired"].discard(driver)
+    with contextlib.suppress(Exception):
+        driver.close()
+
+
+def _close_neo4j_driver() -> None:
+    with _NEO4J_DRIVER_LOCK:
+        drivers = [_NEO4J_DRIVER_STATE.get("driver"), *_NEO4J_DRIVER_STATE["retired"]]
+        _NEO4J_DRIVER_STATE["driver"] = None
+        _NEO4J_DRIVER_STATE["key"] = None
+        _NEO4J_DRIVER_STATE["retired"] = set()
+    for driver in drivers:
+        if driver is not None:
+            with contextlib.suppress(Exception):
+                driver.close()
 
-def _ensure_readonly(query: str) -> None:
-    q = query.strip()
-    if not q:
-        raise ValueError("Empty Cypher query")
-    # Allow CALL ... RETURN style procedures, but block obvious writes.
-    banned = [
-        r"\bCREATE\b",
-        r"\bMERGE\b",
-        r"\bDELETE\b",
-        r"\bDETACH\s+DELETE\b",
-        r"\bSET\b",
-        r"\bDROP\b",
-        r"\bREMOVE\b",
-        r"\bLOAD\s+CSV\b",
-        r"\bCALL\s+db\.index\.",  # schema mutation-ish; keep conservative
-        r"\bCALL\s+db\.constraints\.",  # may include create/drop
-    ]
-    for pat in banned:
-        if re.search(pat, q, flags=re.IGNORECASE):
-            raise ValueError("Only read-only Cypher is allowed by this MCP tool.")
+
+def _mark_neo4j_driver_dirty(changed: set[str]) -> None:
+    # Settings are compared on the next call, so unrelated SIRVIST_NEO4J_* edits do not rebuild.
+    with _NEO4J_DRIVER_LOCK:
+        _NEO4J_DRIVER_STATE["dirty"] = True
+
+
+atexit.register(_close_neo4j_driver)
 
 
 repo_root = _repo_root()
-repo_env = _load_repo_env(repo_root)
+_REPO_CONFIG = _RepoConfig(
+    env_files=[env_example_path(), env_path()],
+    allowlist_dir=bifrost_allowlists_dir(),
+    check_interval_s=float(os.getenv("SIRVIST_CONFIG_CHECK_S") or 2.0),
+)
+_REPO_CONFIG.subscribe(
+    ("NEO4J_URI", "NEO4J_USERNAME", "NEO4J_USER", "NEO4J_PASSWORD", "SIRVIST_NEO4J_*"),
+    _mark_neo4j_driver_dirty,
+)
 mcp = FastMCP("sirvist")
 
 _TAG_RE = re.compile(r"<[^>]+>")
@@ -90,7 +323,7 @@ def _env(name: str, default: str = "") -> str:
     v = (os.getenv(name) or "").strip().strip('"')
     if v:
         return v
-    v2 = (repo_env.get(name) or "").strip().strip('"')
+    v2 = (_REPO_CONFIG.env().get(name) or "").strip().strip('"')
     return v2 if v2 else default
 
 
@@ -104,28 +337,397 @@ def _int_env(name: str, default: int) -> int:
         return default
 
 
-_TOKEN_CACHE: dict[str, Any] = {"token": None, "ts": 0.0}
+def _float_env(name: str, default: float) -> float:
+    raw = _env(name, "")
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except Exception:
+        return default
 
 
-def _gcloud_adc_access_token() -> str:
-    token = _env("SIRVIST_VERTEX_ACCESS_TOKEN") or _env("VERTEX_ACCESS_TOKEN")
-    if token:
-        return token
+def _bool_env(name: str, default: bool) -> bool:
+    raw = _env(name, "").lower()
+    if not raw:
+        return default
+    return raw in {"1", "true", "yes", "on"}
+
+
+# FastMCP calls synchronous tools directly on its event loop, so one slow Vertex/LangGraph/Neo4j
+# call would stall every other request. Blocking tools run here instead; the bound keeps a burst
+# of calls from exhausting Neo4j/HTTP pools (excess calls queue).
+_TOOL_POOL = ThreadPoolExecutor(
+    max_workers=max(1, _int_env("SIRVIST_TOOL_WORKERS", 16)), thread_name_prefix="sirvist-tool"
+)
+
+
+async def _run_in_tool_pool(fn: Any, /, *args: Any, **kwargs: Any) -> Any:
+    # Carry contextvars over: FastMCP's request context must be visible to progress callbacks.
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_TOOL_POOL, call)
+
+
+def _offloaded(fn: Any) -> Any:
+    """Turn a blocking tool function into an async handler that runs it on `_TOOL_POOL`."""
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await _run_in_tool_pool(fn, *args, **kwargs)
+
+    return wrapper
+
+
+_HTTP_CLIENT_LOCK = threading.Lock()
+# "users" counts in-flight requests per client (a streamed response until it is closed), so a
+# client retired by a settings change is closed only once its last request has finished.
+_HTTP_CLIENT: dict[str, Any] = {"client": None, "users": {}, "retired": set()}
+_HTTP_STATS_LOCK = threading.Lock()
+_HTTP_STATS: dict[str, int] = {"requests": 0, "new_connections": 0, "errors": 0}
 
-    now = time.time()
-    cached = _TOKEN_CACHE.get("token")
-    ts = float(_TOKEN_CACHE.get("ts") or 0.0)
-    # Access tokens are typically ~1 hour. Refresh after 30 min.
-    if cached and (now - ts) < 1800:
-        return str(cached)
 
-    out = subprocess.check_output(
+def _http_client() -> httpx.Client:
+    """
+    Check out the shared, thread-safe HTTP client used for Vertex, Bifrost and LangGraph calls.
+
+    httpx keeps a keep-alive pool per (scheme, host, port), so repeated calls to the same
+    upstream skip the TCP/TLS handshake. HTTP/2 is opt-in and needs the `h2` package. Every call
+    must be paired with `_release_http_client`.
+    """
+    while True:
+        settings: dict[str, Any] | None = None
+        if _HTTP_CLIENT["client"] is None:
+            # Settings are read before taking the lock: env reads may revalidate the repo config.
+            settings = {
+                "limits": httpx.Limits(
+                    max_connections=max(1, _int_env("SIRVIST_HTTP_MAX_CONNECTIONS", 100)),
+                    max_keepalive_connections=max(0, _int_env("SIRVIST_HTTP_MAX_KEEPALIVE", 20)),
+                    keepalive_expiry=_float_env("SIRVIST_HTTP_KEEPALIVE_EXPIRY_S", 60.0),
+                ),
+                # HTTP/2 silently degrades to HTTP/1.1 keep-alive when `h2` is not installed.
+                "http2": _bool_env("SIRVIST_HTTP2", False)
+                and importlib.util.find_spec("h2") is not None,
+            }
+        with _HTTP_CLIENT_LOCK:
+            client = _HTTP_CLIENT["client"]
+            if client is None:
+                if settings is None:
+                    continue  # retired between the two checks; re-read the new settings
+                client = httpx.Client(**settings)
+                _HTTP_CLIENT["client"] = client
+            users: dict[httpx.Client, int] = _HTTP_CLIENT["users"]
+            users[client] = users.get(client, 0) + 1
+            return client
+
+
+def _release_http_client(client: httpx.Client) -> None:
+    with _HTTP_CLIENT_LOCK:
+        users: dict[httpx.Client, int] = _HTTP_CLIENT["users"]
+        users[client] -= 1
+        if users[client] > 0:
+            return
+        del users[client]
+        if client not in _HTTP_CLIENT["retired"]:
+            return
+        _HTTP_CLIENT["retired"].discard(client)
+    with contextlib.suppress(Exception):
+        client.close()
+
+
+def _close_http_client() -> None:
+    with _HTTP_CLIENT_LOCK:
+        clients = [_HTTP_CLIENT["client"], *_HTTP_CLIENT["retired"]]
+        _HTTP_CLIENT["client"] = None
+        _HTTP_CLIENT["retired"] = set()
+    for client in clients:
+        if client is not None:
+            with contextlib.suppress(Exception):
+                client.close()
+
+
+def _retire_http_client(changed: set[str]) -> None:
+    """Swap in a client built from the new SIRVIST_HTTP_* settings on the next request."""
+    with _HTTP_CLIENT_LOCK:
+        client = _HTTP_CLIENT["client"]
+        _HTTP_CLIENT["client"] = None
+        if client is None:
+            return
+        if _HTTP_CLIENT["users"].get(client):
+            # Requests and streams in flight keep the old pool; the last one to finish closes it.
+            _HTTP_CLIENT["retired"].add(client)
+            return
+    with contextlib.suppress(Exception):
+        client.close()
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body wrapper that checks the client back in once the response is closed."""
+
+    def __init__(self, stream: httpx.SyncByteStream, client: httpx.Client) -> None:
+        self._stream = stream
+        self._client: httpx.Client | None = client
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            # Deadline timers may close a response while its reader is closing it too.
+            with self._lock:
+                client, self._client = self._client, None
+            if client is not None:
+                _release_http_client(client)
+
+
+atexit.register(_close_http_client)
+_REPO_CONFIG.subscribe(("SIRVIST_HTTP_*",), _retire_http_client)
+
+
+def _http_trace(event_name: str, info: dict[str, Any]) -> None:
+    # httpcore emits connect_tcp only when it has to open a new connection.
+    if event_name == "connection.connect_tcp.complete":
+        with _HTTP_STATS_LOCK:
+            _HTTP_STATS["new_connections"] += 1
+
+
+def _http_request(
+    method: str,
+    url: str,
+    *,
+    json_body: Any = None,
+    form: dict[str, str] | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: float = 30.0,
+    stream: bool = False,
+) -> httpx.Response:
+    """
+    Send a request through the shared client.
+
+    With ``stream=True`` the body is not read up front; the caller iterates it and must close the
+    response (e.g. via ``contextlib.closing``) to hand the connection back.
+    """
+    with _HTTP_STATS_LOCK:
+        _HTTP_STATS["requests"] += 1
+    base_headers = {} if form is not None else {"content-type": "application/json"}
+    client = _http_client()
+    try:
+        request = client.build_request(
+            method.upper(),
+            url,
+            content=json.dumps(json_body).encode("utf-8") if json_body is not None else None,
+            data=form,
+            headers={**base_headers, **(headers or {})},
+            timeout=httpx.Timeout(
+                max(1.0, timeout), connect=_float_env("SIRVIST_HTTP_CONNECT_TIMEOUT_S", 10.0)
+            ),
+            extensions={"trace": _http_trace},
+        )
+        resp = client.send(request, stream=stream)
+    except Exception:
+        with _HTTP_STATS_LOCK:
+            _HTTP_STATS["errors"] += 1
+        _release_http_client(client)
+        raise
+    if not stream:
+        _release_http_client(client)
+        return resp
+    # A streamed response keeps the client checked out until the caller closes it.
+    resp.stream = _ReleasingStream(resp.stream, client)
+    return resp
+
+
+def _http_stats() -> dict[str, Any]:
+    with _HTTP_STATS_LOCK:
+        stats: dict[str, Any] = dict(_HTTP_STATS)
+    stats["reused_connections"] = max(0, stats["requests"] - stats["new_connections"])
+    return stats
+
+
+_GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
+_CLOUD_PLATFORM_SCOPE = "https://www.googleapis.com/auth/cloud-platform"
+
+
+def _adc_credentials_path() -> Path:
+    explicit = _env("GOOGLE_APPLICATION_CREDENTIALS", "")
+    if explicit:
+        return Path(explicit).expanduser()
+    return Path.home() / ".config" / "gcloud" / "application_default_credentials.json"
+
+
+def _token_from_adc_file() -> tuple[str, float]:
+    """
+    Mint an access token straight from the ADC JSON file (no gcloud subprocess).
+
+    Supports `authorized_user` (refresh-token grant) and `service_account` (JWT-bearer grant;
+    signing needs PyJWT + cryptography, which the MCP lock already pulls in).
+    """
+    creds = json.loads(_adc_credentials_path().read_text(encoding="utf-8"))
+    token_uri = str(creds.get("token_uri") or _GOOGLE_TOKEN_URI)
+    kind = creds.get("type")
+    if kind == "authorized_user":
+        form = {
+            "grant_type": "refresh_token",
+            "client_id": creds["client_id"],
+            "client_secret": creds["client_secret"],
+            "refresh_token": creds["refresh_token"],
+        }
+    elif kind == "service_account":
+        import jwt
+
+        now = int(time.time())
+        assertion = jwt.encode(
+            {
+                "iss": creds["client_email"],
+                "scope": _CLOUD_PLATFORM_SCOPE,
+                "aud": token_uri,
+                "iat": now,
+                "exp": now + 3600,
+            },
+            creds["private_key"],
+            algorithm="RS256",
+            headers={"kid": creds.get("private_key_id")},
+        )
+        form = {"grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer", "assertion": assertion}
+    else:
+        raise ValueError(f"Unsupported ADC credential type: {kind!r}")
+
+    resp = _http_request("POST", token_uri, form=form, timeout=30)
+    if resp.status_code >= 400:
+        raise RuntimeError(f"ADC token refresh HTTP {resp.status_code}: {resp.text}")
+    data = resp.json()
+    return str(data["access_token"]), time.time() + float(data.get("expires_in") or 3600)
+
+
+def _token_from_gcloud() -> tuple[str, float]:
+    token = subprocess.check_output(
         ["gcloud", "auth", "application-default", "print-access-token"],
         text=True,
     ).strip()
-    _TOKEN_CACHE["token"] = out
-    _TOKEN_CACHE["ts"] = now
-    return out
+    # gcloud prints only the token; ask tokeninfo for its real lifetime.
+    expires_at = time.time() + 1800
+    with contextlib.suppress(Exception):
+        # Form body rather than query string, so the token never lands in URL/access logs.
+        resp = _http_request(
+            "POST",
+            "https://oauth2.googleapis.com/tokeninfo",
+            form={"access_token": token},
+            timeout=10,
+        )
+        if resp.status_code < 400:
+            expires_at = time.time() + float(resp.json().get("expires_in") or 1800)
+    return token, expires_at
+
+
+class _AccessTokenProvider:
+    """
+    Cached Google access token with single-flight refresh.
+
+    Each successful fetch arms a timer that refreshes `refresh_ahead_s` before expiry, so an
+    idle server still holds a valid token when the next request arrives. If the timer's fetch
+    fails, the first caller inside the refresh window starts one background refresh while
+    everyone keeps using the still-valid token. Only when no valid token exists do callers
+    block, and then only one of them fetches while the rest wait for its result.
+    """
+
+    def __init__(self, *, refresh_ahead_s: float, min_validity_s: float) -> None:
+        self.refresh_ahead_s = refresh_ahead_s
+        self.min_validity_s = min_validity_s
+        self._state_lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._token: str | None = None
+        self._expires_at = 0.0
+        self._refreshing = False
+        self._timer: threading.Timer | None = None
+
+    def _fetch(self) -> tuple[str, float]:
+        try:
+            return _token_from_adc_file()
+        except Exception:
+            return _token_from_gcloud()
+
+    def _refresh(self, *, force: bool = False) -> str:
+        try:
+            with self._fetch_lock:
+                with self._state_lock:
+                    # Another caller may have refreshed while we waited for the fetch lock.
+                    fresh = time.time() < self._expires_at - self.refresh_ahead_s
+                    if self._token and fresh and not force:
+                        return self._token
+                token, expires_at = self._fetch()
+                with self._state_lock:
+                    self._token, self._expires_at = token, expires_at
+                    self._arm_timer(expires_at - self.refresh_ahead_s - time.time())
+                return token
+        finally:
+            with self._state_lock:
+                self._refreshing = False
+
+    def _arm_timer(self, delay_s: float) -> None:
+        # Caller holds _state_lock.
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(1.0, delay_s), self._on_timer)
+        self._timer.name = "vertex-token-timer"
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._state_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        try:
+            self._refresh(force=True)
+        except Exception as exc:
+            logger.warning("Scheduled Vertex token refresh failed: %s", exc)
+            with self._state_lock:
+                # Retry while the current token is still usable; callers take over after that.
+                if self._token and time.time() < self._expires_at - self.min_validity_s:
+                    self._arm_timer(30.0)
+
+    def _refresh_in_background(self) -> None:
+        with contextlib.suppress(Exception):
+            self._refresh()
+
+    def get(self) -> str:
+        now = time.time()
+        with self._state_lock:
+            token = self._token
+            valid = token is not None and now < self._expires_at - self.min_validity_s
+            start_background = (
+                valid and now >= self._expires_at - self.refresh_ahead_s and not self._refreshing
+            )
+            if start_background:
+                self._refreshing = True
+        if valid and token is not None:
+            if start_background:
+                threading.Thread(
+                    target=self._refresh_in_background, name="vertex-token-refresh", daemon=True
+                ).start()
+            return token
+        return self._refresh()
+
+    def prefetch(self) -> None:
+        """Warm the cache off the request path (e.g. at server start)."""
+        threading.Thread(
+            target=self._refresh_in_background, name="vertex-token-prefetch", daemon=True
+        ).start()
+
+
+_VERTEX_TOKENS = _AccessTokenProvider(
+    refresh_ahead_s=_float_env("SIRVIST_VERTEX_TOKEN_REFRESH_AHEAD_S", 300.0),
+    min_validity_s=_float_env("SIRVIST_VERTEX_TOKEN_MIN_VALIDITY_S", 60.0),
+)
+
+
+def _gcloud_adc_access_token() -> str:
+    token = _env("SIRVIST_VERTEX_ACCESS_TOKEN") or _env("VERTEX_ACCESS_TOKEN")
+    if token:
+        return token
+    return _VERTEX_TOKENS.get()
 
 
 def _clean_snippet(snippet: str) -> str:
@@ -136,7 +738,9 @@ def _clean_snippet(snippet: str) -> str:
     return s
 
 
-def _vertex_ai_search(*, datastore_id: str, query: str, k: int) -> dict[str, Any]:
+def _vertex_ai_search(
+    *, datastore_id: str, query: str, k: int, timeout: float = 30.0
+) -> dict[str, Any]:
     project = _env("SIRVIST_VERTEX_PROJECT_ID", _env("GOOGLE_CLOUD_PROJECT", ""))
     location = _env("SIRVIST_VERTEX_LOCATION", _env("GOOGLE_CLOUD_LOCATION", "global")) or "global"
     collection = _env("SIRVIST_VERTEX_COLLECTION", "default_collection")
@@ -157,23 +761,16 @@ def _vertex_ai_search(*, datastore_id: str, query: str, k: int) -> dict[str, Any
         "contentSearchSpec": {"snippetSpec": {"returnSnippet": True}},
     }
     token = _gcloud_adc_access_token()
-    req = urllib.request.Request(
-        url=url,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={
-            "content-type": "application/json",
-            "authorization": f"Bearer {token}",
-        },
-        method="POST",
+    resp = _http_request(
+        "POST",
+        url,
+        json_body=payload,
+        headers={"authorization": f"Bearer {token}"},
+        timeout=timeout,
     )
-    try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            return json.loads(resp.read().decode("utf-8", "replace"))
-    except urllib.error.HTTPError as e:
-        detail = e.read().decode("utf-8", errors="replace") if hasattr(e, "read") else str(e)
-        raise RuntimeError(
-            f"Vertex AI Search HTTP {getattr(e, 'code', 'unknown')}: {detail}"
-        ) from e
+    if resp.status_code >= 400:
+        raise RuntimeError(f"Vertex AI Search HTTP {resp.status_code}: {resp.text}")
+    return resp.json()
 
 
 def _build_evidence_packet(
@@ -231,36 +828,57 @@ def _build_evidence_packet(
             }
         )
 
-    raw_json = json.dumps(packet, ensure_ascii=False)
-    if max_packet_chars > 0 and len(raw_json) > max_packet_chars:
-        for r in packet.get("results", []):
-            if isinstance(r, dict):
-                r["snippet"] = None
-        raw_json = json.dumps(packet, ensure_ascii=False)
-        if len(raw_json) > max_packet_chars:
-            packet["results"] = (packet.get("results") or [])[: max(1, max_results // 2)]
-
+    if max_packet_chars > 0:
+        _pack_results(packet, max_packet_chars)
     return packet
 
 
-def _load_json_list(path: Path) -> set[str]:
-    try:
-        data = json.loads(path.read_text(encoding="utf-8"))
-        if isinstance(data, list):
-            return {str(x).strip() for x in data if str(x).strip()}
-    except Exception:
-        return set()
-    return set()
+def _json_len(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False))
 
 
-_BIFROST_MODEL_ALLOWLIST: dict[str, set[str]] = {
-    "openai": _load_json_list(bifrost_allowlists_dir() / "global_openai_models.json"),
-    "vertex": set().union(
-        _load_json_list(bifrost_allowlists_dir() / "global_vertex_models.json"),
-        _load_json_list(bifrost_allowlists_dir() / "us_central1_vertex_models.json"),
-        _load_json_list(bifrost_allowlists_dir() / "us_south1_vertex_models.json"),
-    ),
-}
+def _pack_results(packet: dict[str, Any], budget: int) -> None:
+    """
+    Fit `packet` into `budget` serialized chars in one pass over its results.
+
+    Each result is measured once with its snippet replaced by null (its fixed cost). If the
+    packet does not fit, lowest-ranked results are dropped only until the snippet-less packet
+    fits; the remaining budget is then shared across snippets in proportion to their length.
+    """
+    results: list[dict[str, Any]] = packet["results"]
+    if not results:
+        return
+    null_len = 4  # len("null")
+    base = _json_len({**packet, "results": []})
+    fixed = [_json_len({**r, "snippet": None}) for r in results]
+    extra = [(_json_len(r["snippet"]) - null_len) if r.get("snippet") else 0 for r in results]
+
+    def size(n: int, with_snippets: bool) -> int:
+        body = sum(fixed[:n]) + (sum(extra[:n]) if with_snippets else 0)
+        return base + body + 2 * (n - 1)  # ", " between list items
+
+    n = len(results)
+    if size(n, True) <= budget:
+        return
+    while n > 1 and size(n, False) > budget:
+        n -= 1
+    del results[n:]
+
+    available = budget - size(n, False)
+    wanted = sum(extra[:n])
+    ratio = min(1.0, available / wanted) if wanted else 0.0
+    for r, want in zip(results, extra[:n], strict=True):
+        if not want:
+            continue
+        # Serialized snippet may use at most share + len("null") chars: quotes, text and "…".
+        limit = int(want * ratio) + null_len
+        text = r["snippet"]
+        if _json_len(text) <= limit:
+            continue  # fits untouched; only truncated snippets get an ellipsis
+        keep = min(len(text), limit - 3)
+        while keep > 0 and _json_len(text[:keep] + "…") > limit:
+            keep -= max(1, _json_len(text[:keep] + "…") - limit)
+        r["snippet"] = (text[:keep].rstrip() + "…") if keep > 0 else None
 
 
 def _enforce_bifrost_model_allowlist(model: str) -> None:
@@ -270,7 +888,7 @@ def _enforce_bifrost_model_allowlist(model: str) -> None:
     if "/" not in raw:
         raise ValueError("model must be provider-prefixed (e.g., openai/gpt-5.2-2025-12-11).")
     provider, model_id = raw.split("/", 1)
-    allow = _BIFROST_MODEL_ALLOWLIST.get(provider.strip().lower())
+    allow = _REPO_CONFIG.allowlists().get(provider.strip().lower())
     if not allow:
         return
     if model_id.strip() not in allow:
@@ -280,348 +898,2881 @@ def _enforce_bifrost_model_allowlist(model: str) -> None:
         )
 
 
-def _bifrost_chat_completions(
-    *,
-    model: str,
-    messages: list[dict[str, Any]],
-    max_tokens: int,
-    temperature: float,
-) -> dict[str, Any]:
+def _bifrost_endpoint(model: str) -> tuple[str, dict[str, str]]:
     bifrost_url = _env("BIFROST_URL", "http://localhost:8080").rstrip("/")
     bifrost_vk = _env("BIFROST_API_KEY", _env("BIFROST_VK", "")).strip()
     if not bifrost_vk:
         raise ValueError("Missing Bifrost VK (set BIFROST_API_KEY or BIFROST_VK).")
 
     _enforce_bifrost_model_allowlist(model)
+    return f"{bifrost_url}/v1/chat/completions", {"x-bf-vk": bifrost_vk}
+
+
+class _BifrostUpstreamError(RuntimeError):
+    """A Bifrost failure the retry policy has already reported to the circuit breaker."""
+
+
+class _CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive upstream failures; open calls fail fast.
+
+    After `reset_after_s` the breaker goes half-open and lets exactly one probe through: success
+    closes it, failure re-opens it for another `reset_after_s`. `before` returns True only to the
+    call that took the probe slot; that call (and no other) releases it in a `finally`, so a probe
+    that ends without a verdict lets the next call probe again.
+    """
+
+    def __init__(self, *, failure_threshold: int, reset_after_s: float) -> None:
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_after_s = max(0.0, float(reset_after_s))
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def before(self, name: str) -> bool:
+        """Raise if the call must fail fast; return True if it holds the half-open probe."""
+        with self._lock:
+            if self.state == "closed":
+                return False
+            if self.state == "open":
+                remaining = self.opened_at + self.reset_after_s - time.monotonic()
+                if remaining > 0:
+                    raise RuntimeError(
+                        f"Bifrost circuit open for {name}; failing fast for another "
+                        f"{remaining:.0f}s"
+                    )
+                self.state = "half_open"
+            # A probe that never reported back (e.g. an unexpected exception) expires eventually.
+            now = time.monotonic()
+            if self._probing and now - self._probe_started < max(self.reset_after_s, 300.0):
+                raise RuntimeError(f"Bifrost circuit half-open for {name}; probe in flight")
+            self._probing = True
+            self._probe_started = now
+            return True
+
+    def release_probe(self) -> None:
+        with self._lock:
+            self._probing = False
 
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if the breaker is (now) open."""
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probing = False
+            return self.state == "open"
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            out: dict[str, Any] = {"state": self.state, "failures": self.failures}
+            if self.state == "open":
+                out["retry_in_s"] = round(
+                    max(0.0, self.opened_at + self.reset_after_s - time.monotonic()), 1
+                )
+            return out
+
+
+_BIFROST_HEALTH_LOCK = threading.Lock()
+_BIFROST_BREAKERS: dict[str, _CircuitBreaker] = {}
+# Models that answered "Only the default (1) value is supported" for temperature.
+_BIFROST_NO_TEMPERATURE: set[str] = set()
+_BIFROST_LATENCIES: dict[str, deque[float]] = {}
+_BIFROST_HEDGE_STATS = {"hedged": 0, "hedge_won": 0}
+
+
+def _bifrost_breaker(model: str) -> _CircuitBreaker:
+    with _BIFROST_HEALTH_LOCK:
+        breaker = _BIFROST_BREAKERS.get(model)
+        if breaker is None:
+            breaker = _CircuitBreaker(
+                failure_threshold=_int_env("SIRVIST_BIFROST_BREAKER_FAILURES", 5),
+                reset_after_s=_float_env("SIRVIST_BIFROST_BREAKER_RESET_S", 30.0),
+            )
+            _BIFROST_BREAKERS[model] = breaker
+        return breaker
+
+
+def _bifrost_payload(
+    model: str, messages: list[dict[str, Any]], max_tokens: int, temperature: float
+) -> dict[str, Any]:
     payload: dict[str, Any] = {
         "model": model,
         "messages": messages,
         "max_tokens": int(max_tokens),
     }
     # Some models (notably certain OpenAI versions) reject non-default temperature values.
-    # We optimistically include it, but will retry without temperature if the provider rejects it.
-    payload["temperature"] = float(temperature)
-    last_detail = ""
-    for attempt in range(3):
-        req = urllib.request.Request(
-            url=f"{bifrost_url}/v1/chat/completions",
-            data=json.dumps(payload).encode("utf-8"),
-            headers={
-                "content-type": "application/json",
-                "x-bf-vk": bifrost_vk,
-            },
-            method="POST",
-        )
-        try:
-            with urllib.request.urlopen(req, timeout=90) as resp:
-                return json.loads(resp.read().decode("utf-8", "replace"))
-        except urllib.error.HTTPError as e:
-            detail = e.read().decode("utf-8", errors="replace") if hasattr(e, "read") else str(e)
-            last_detail = detail
-            code = getattr(e, "code", None)
-            # Retry without temperature if the provider rejects it (common for some OpenAI models).
-            if code == 400 and "temperature" in detail and "Only the default (1)" in detail:
-                payload.pop("temperature", None)
-                continue
-            # Transient provider failures.
-            if code in {502, 503, 504} and attempt < 2:
-                time.sleep(2**attempt)
-                continue
-            raise RuntimeError(f"Bifrost HTTP {code or 'unknown'}: {detail}") from e
+    # We optimistically include it unless this model already rejected it once.
+    with _BIFROST_HEALTH_LOCK:
+        if model not in _BIFROST_NO_TEMPERATURE:
+            payload["temperature"] = float(temperature)
+    return payload
 
-    raise RuntimeError(f"Bifrost failed after retries: {last_detail}")
 
+def _bifrost_retry_or_raise(
+    model: str, payload: dict[str, Any], *, code: int, detail: str, attempt: int
+) -> None:
+    """
+    Apply the retry policy to a failed attempt: return to retry, raise to give up.
 
-def _langgraph_base_url() -> str:
-    return (_env("SIRVIST_LANGGRAPH_URL", _env("LANGGRAPH_URL", "http://localhost:2024"))).rstrip(
-        "/"
-    )
+    code 0 stands for a transport error (connect/read failure) and counts like a 5xx.
+    """
+    rejects_temperature = "temperature" in detail and "Only the default (1)" in detail
+    if code == 400 and rejects_temperature and "temperature" in payload:
+        with _BIFROST_HEALTH_LOCK:
+            _BIFROST_NO_TEMPERATURE.add(model)
+        payload.pop("temperature", None)
+        return
+    breaker = _bifrost_breaker(model)
+    if code == 0 or code >= 500:
+        opened = breaker.record_failure()
+        if (code == 0 or code in {502, 503, 504}) and attempt < 2 and not opened:
+            # Jittered exponential backoff so concurrent callers do not retry in lockstep.
+            delay = 2**attempt
+            time.sleep(delay / 2 + random.uniform(0, delay / 2))
+            return
+    else:
+        # A 4xx still proves the upstream is reachable.
+        breaker.record_success()
+    if code == 0:
+        raise _BifrostUpstreamError(f"Bifrost request failed: {detail}")
+    raise _BifrostUpstreamError(f"Bifrost HTTP {code}: {detail}")
 
 
-def _http_json(method: str, url: str, payload: dict[str, Any] | None) -> Any:
-    body = json.dumps(payload).encode("utf-8") if payload is not None else None
-    req = urllib.request.Request(
-        url=url,
-        data=body,
-        headers={"content-type": "application/json"},
-        method=method.upper(),
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            raw = resp.read().decode("utf-8", "replace")
-        return json.loads(raw) if raw.strip() else {}
-    except urllib.error.HTTPError as e:
-        detail = e.read().decode("utf-8", errors="replace") if hasattr(e, "read") else str(e)
-        raise RuntimeError(f"HTTP {getattr(e, 'code', 'unknown')}: {detail}") from e
+def _bifrost_hedge_after_s(model: str) -> float | None:
+    """Latency percentile after which a duplicate request is sent, or None when hedging is off."""
+    percentile = _float_env("SIRVIST_BIFROST_HEDGE_PERCENTILE", 0.0)
+    if percentile <= 0:
+        return None
+    with _BIFROST_HEALTH_LOCK:
+        samples = sorted(_BIFROST_LATENCIES.get(model) or ())
+    if len(samples) < _int_env("SIRVIST_BIFROST_HEDGE_MIN_SAMPLES", 20):
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * min(percentile, 100.0) / 100.0))]
 
 
-def _as_dict(value: Any, *, list_key: str = "items") -> dict[str, Any]:
-    if isinstance(value, dict):
-        return value
-    if isinstance(value, list):
-        return {list_key: value, "count": len(value)}
-    return {"value": value}
+def _bifrost_timed_post(
+    model: str, url: str, payload: dict[str, Any], headers: dict[str, str]
+) -> httpx.Response:
+    started = time.monotonic()
+    resp = _http_request("POST", url, json_body=payload, headers=headers, timeout=90)
+    if resp.status_code < 400:
+        with _BIFROST_HEALTH_LOCK:
+            window = _BIFROST_LATENCIES.setdefault(model, deque(maxlen=200))
+            window.append(time.monotonic() - started)
+    return resp
 
 
-@mcp.tool(
-    name="neo4j_query",
-    description="Run a READ-ONLY Cypher query against the local Sirvist Neo4j instance.",
-)
-def neo4j_query(query: str, params_json: str | None = None, limit: int = 200) -> dict[str, Any]:
-    _ensure_readonly(query)
-    params: dict[str, Any] = {}
-    if params_json:
-        params = json.loads(params_json)
-        if not isinstance(params, dict):
-            raise ValueError("params_json must decode to a JSON object")
-    if limit <= 0 or limit > 2000:
-        raise ValueError("limit must be between 1 and 2000")
+_BIFROST_HEDGE_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="bifrost-hedge")
 
-    # Best-effort cap to avoid huge payloads; only apply if query doesn't already contain LIMIT.
-    capped_query = query
-    if re.search(r"\bLIMIT\b", query, flags=re.IGNORECASE) is None:
-        capped_query = f"{query.rstrip()}\nLIMIT {limit}"
 
-    driver = _neo4j_driver(repo_root)
-    try:
-        with driver.session() as session:
-            rows = session.run(capped_query, **params).data()
-            return {"rows": rows, "row_count": len(rows)}
-    finally:
-        driver.close()
+def _bifrost_post(
+    model: str, url: str, payload: dict[str, Any], headers: dict[str, str]
+) -> httpx.Response:
+    """
+    Send one attempt. With SIRVIST_BIFROST_HEDGE_PERCENTILE set, a duplicate request goes out when
+    the first has been pending longer than that percentile of the model's recent latencies, and
+    the first usable answer wins (the loser finishes in the background and is discarded).
+    """
+    hedge_after_s = _bifrost_hedge_after_s(model)
+    if hedge_after_s is None:
+        return _bifrost_timed_post(model, url, payload, headers)
 
+    primary = _BIFROST_HEDGE_POOL.submit(_bifrost_timed_post, model, url, dict(payload), headers)
+    done, _ = wait_futures([primary], timeout=hedge_after_s)
+    if done:
+        return primary.result()
+    hedge = _BIFROST_HEDGE_POOL.submit(_bifrost_timed_post, model, url, dict(payload), headers)
+    with _BIFROST_HEALTH_LOCK:
+        _BIFROST_HEDGE_STATS["hedged"] += 1
 
-def _ensure_schema_only(query: str) -> None:
-    q = query.strip()
-    if not q:
-        raise ValueError("Empty Cypher query")
-    # Only allow schema operations (constraints/indexes) and introspection.
-    allowed = [
-        r"^\s*CREATE\s+(CONSTRAINT|INDEX)\b",
-        r"^\s*DROP\s+(CONSTRAINT|INDEX)\b",
-        r"^\s*SHOW\s+(CONSTRAINTS|INDEXES)\b",
-        r"^\s*CALL\s+db\.constraints\b",
-        r"^\s*CALL\s+db\.indexes\b",
-    ]
-    if not any(re.search(pat, q, flags=re.IGNORECASE) for pat in allowed):
-        raise ValueError("Only schema/index/constraint operations are allowed by this MCP tool.")
-    # Extra safety: reject non-schema writes even if mixed in.
-    banned = [r"\bCREATE\b(?!\s+(CONSTRAINT|INDEX)\b)", r"\bMERGE\b", r"\bDELETE\b", r"\bSET\b"]
-    for pat in banned:
-        if re.search(pat, q, flags=re.IGNORECASE):
-            raise ValueError("Non-schema writes are not allowed by this MCP tool.")
+    pending = {primary, hedge}
+    fallback: httpx.Response | None = None
+    error: BaseException | None = None
+    while pending:
+        done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            try:
+                resp = fut.result()
+            except Exception as e:
+                error = e
+                continue
+            if resp.status_code < 500:
+                if fut is hedge:
+                    with _BIFROST_HEALTH_LOCK:
+                        _BIFROST_HEDGE_STATS["hedge_won"] += 1
+                return resp
+            fallback = resp
+    if fallback is not None:
+        return fallback
+    assert error is not None
+    raise error
 
 
-@mcp.tool(
-    name="neo4j_schema",
-    description=(
-        "Run Cypher schema operations ONLY (constraints/indexes) against "
-        "the local Sirvist Neo4j instance."
-    ),
-)
-def neo4j_schema(query: str) -> dict[str, Any]:
-    _ensure_schema_only(query)
-    driver = _neo4j_driver(repo_root)
-    try:
-        with driver.session() as session:
-            res = session.run(query)
-            # Consume summary for side-effect queries.
-            summary = res.consume()
-            counters = summary.counters
-            return {
-                "ok": True,
-                "counters": {
-                    "constraints_added": counters.constraints_added,
-                    "constraints_removed": counters.constraints_removed,
-                    "indexes_added": counters.indexes_added,
-                    "indexes_removed": counters.indexes_removed,
-                },
-                "notifications": [n.get("description") for n in (summary.notifications or [])],
-            }
-    finally:
-        driver.close()
+def _bifrost_health() -> dict[str, Any]:
+    with _BIFROST_HEALTH_LOCK:
+        breakers = dict(_BIFROST_BREAKERS)
+        out: dict[str, Any] = {
+            "no_temperature_models": sorted(_BIFROST_NO_TEMPERATURE),
+            "hedging": dict(_BIFROST_HEDGE_STATS),
+            "latency_samples": {m: len(w) for m, w in _BIFROST_LATENCIES.items()},
+        }
+    out["breakers"] = {model: b.snapshot() for model, b in breakers.items()}
+    return out
 
 
-@mcp.tool(
-    name="neo4j_inventory",
-    description=(
-        "Return basic inventory: labels and relationship types (counts only, plus sample lists)."
-    ),
-)
-def neo4j_inventory() -> dict[str, Any]:
-    driver = _neo4j_driver(repo_root)
-    try:
-        with driver.session() as session:
-            labels = [
-                r["label"]
-                for r in session.run(
-                    "CALL db.labels() YIELD label RETURN label ORDER BY label"
-                ).data()
-            ]
-            rels = [
-                r["relationshipType"]
-                for r in session.run(
-                    "CALL db.relationshipTypes() YIELD relationshipType "
-                    "RETURN relationshipType ORDER BY relationshipType"
-                ).data()
-            ]
-            return {
-                "labels_count": len(labels),
-                "rels_count": len(rels),
-                "labels_sample": labels[:200],
-                "rels_sample": rels[:200],
-            }
+def _bifrost_chat_completions(
+    *,
+    model: str,
+    messages: list[dict[str, Any]],
+    max_tokens: int,
+    temperature: float,
+) -> dict[str, Any]:
+    url, headers = _bifrost_endpoint(model)
+    payload = _bifrost_payload(model, messages, max_tokens, temperature)
+    breaker = _bifrost_breaker(model)
+    probing = breaker.before(model)
+    last_detail, last_exc = "", None
+    try:
+        for attempt in range(3):
+            try:
+                resp = _bifrost_post(model, url, payload, headers)
+            except httpx.TransportError as e:
+                last_detail, last_exc = str(e), e
+                _bifrost_retry_or_raise(model, payload, code=0, detail=str(e), attempt=attempt)
+                continue
+            if resp.status_code < 400:
+                breaker.record_success()
+                return resp.json()
+            had_temperature = "temperature" in payload
+            _bifrost_retry_or_raise(
+                model, payload, code=resp.status_code, detail=resp.text, attempt=attempt
+            )
+            if not had_temperature or "temperature" in payload:
+                last_detail, last_exc = f"HTTP {resp.status_code}: {resp.text}", None
+    except _BifrostUpstreamError:
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    finally:
+        if probing:
+            breaker.release_probe()
+
+    # Only reachable when the last attempt was spent dropping an unsupported temperature.
+    raise _BifrostUpstreamError(
+        f"Bifrost failed after retries: {last_detail or 'model rejected temperature'}"
+    ) from last_exc
+
+
+def _assistant_text(resp: dict[str, Any]) -> str:
+    try:
+        return resp["choices"][0]["message"]["content"]
+    except Exception:
+        return ""
+
+
+class _TokenBucket:
+    """Blocking token bucket: `rate_per_s` sustained requests with bursts of up to `burst`."""
+
+    def __init__(self, *, rate_per_s: float, burst: int) -> None:
+        self.rate_per_s = max(0.001, float(rate_per_s))
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take one token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate_per_s
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate_per_s
+            time.sleep(delay)
+
+
+_BIFROST_RATE_LOCK = threading.Lock()
+# model -> ((rpm, burst) the bucket was built with, bucket)
+_BIFROST_RATE_BUCKETS: dict[str, tuple[tuple[float, int], _TokenBucket]] = {}
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_model_rpm(raw: str) -> dict[str, float]:
+    # Cached per raw value, so a malformed entry is reported once rather than on every request.
+    overrides: dict[str, float] = {}
+    for part in raw.split(","):
+        name, _, value = part.partition("=")
+        if not name.strip() and not value.strip():
+            continue
+        try:
+            rpm = float(value)
+            if not name.strip() or rpm <= 0:
+                raise ValueError(value)
+        except ValueError:
+            logger.warning("Ignoring malformed SIRVIST_BIFROST_MODEL_RPM entry %r", part.strip())
+            continue
+        overrides[name.strip()] = rpm
+    return overrides
+
+
+def _bifrost_rate_bucket(model: str) -> _TokenBucket:
+    """
+    Per-model request bucket. SIRVIST_BIFROST_RPM is the default rate; SIRVIST_BIFROST_MODEL_RPM
+    overrides it per model as a comma-separated list of model=rpm. The bucket is rebuilt when
+    the effective rate or burst for the model changes.
+    """
+    rpm = _parse_model_rpm(_env("SIRVIST_BIFROST_MODEL_RPM", "")).get(
+        model, _float_env("SIRVIST_BIFROST_RPM", 120.0)
+    )
+    config = (rpm, _int_env("SIRVIST_BIFROST_BURST", 5))
+    with _BIFROST_RATE_LOCK:
+        cached = _BIFROST_RATE_BUCKETS.get(model)
+        if cached is not None and cached[0] == config:
+            return cached[1]
+        bucket = _TokenBucket(rate_per_s=config[0] / 60.0, burst=config[1])
+        _BIFROST_RATE_BUCKETS[model] = (config, bucket)
+        return bucket
+
+
+# The semaphore is the process-wide cap on in-flight batch requests. It is taken only after the
+# model's rate token, so items throttled on one model do not hold slots other models could use;
+# the pool is sized for waiting threads rather than for concurrency.
+_BIFROST_BATCH_INFLIGHT = threading.BoundedSemaphore(
+    max(1, _int_env("SIRVIST_BIFROST_BATCH_CONCURRENCY", 8))
+)
+_BIFROST_BATCH_POOL = ThreadPoolExecutor(max_workers=64, thread_name_prefix="bifrost-batch")
+
+
+def _bifrost_batch_item(item: Any, defaults: dict[str, Any]) -> dict[str, Any]:
+    if isinstance(item, list):
+        item = {"messages": item}
+    if not isinstance(item, dict) or not isinstance(item.get("messages"), list):
+        raise ValueError("each item must be a messages list or an object with a 'messages' list")
+    model = str(item.get("model") or defaults["model"]).strip()
+    max_tokens = max(1, min(4000, int(item.get("max_tokens") or defaults["max_tokens"])))
+    temperature = float(item.get("temperature", defaults["temperature"]))
+
+    queued = time.perf_counter()
+    _bifrost_rate_bucket(model).acquire()
+    with _BIFROST_BATCH_INFLIGHT:
+        started = time.perf_counter()
+        resp = _bifrost_chat_completions(
+            model=model,
+            messages=[m for m in item["messages"] if isinstance(m, dict)],
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+    queued_s = started - queued
+    return {
+        "model": model,
+        "assistant_text": _assistant_text(resp),
+        "usage": resp.get("usage"),
+        "queued_ms": round(queued_s * 1000, 2),
+        "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def _run_bifrost_batch_item(index: int, item: Any, defaults: dict[str, Any]) -> dict[str, Any]:
+    t0 = time.perf_counter()
+    try:
+        out: dict[str, Any] = {"index": index, "ok": True}
+        out.update(_bifrost_batch_item(item, defaults))
+    except Exception as e:
+        out = {"index": index, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    out["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return out
+
+
+def _iter_sse(resp: httpx.Response) -> Any:
+    """Yield (event, data) per server-sent event; multi-line data is joined with newlines."""
+    event = "message"
+    data: list[str] = []
+    for line in resp.iter_lines():
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "event":
+            event = value
+        elif field == "data":
+            data.append(value)
+    if data:
+        yield event, "\n".join(data)
+
+
+class _ProgressRelay:
+    """
+    Forward progress from a worker thread to the MCP client, coalescing bursts.
+
+    `emit` runs in the worker; pending messages are joined with `sep` and sent at most once per
+    `interval_s` (dropped when there is no request context, e.g. in-process calls). Await
+    `aclose` on the event loop afterwards to flush what is left. The pending buffer is shared
+    between the worker and the loop, so it is only touched under `_lock`.
+    """
+
+    def __init__(
+        self, ctx: Context | None, *, total: float | None = None, interval_s: float, sep: str = ""
+    ) -> None:
+        self.ctx = ctx
+        self.total = total
+        self.interval_s = interval_s
+        self.sep = sep
+        self.progress = 0.0
+        self._loop = asyncio.get_running_loop()
+        self._lock = threading.Lock()
+        self._pending: list[str] = []
+        self._last = 0.0
+
+    def emit(self, progress: float, message: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.progress = progress
+            self._pending.append(message)
+            due = now - self._last >= self.interval_s
+            if due:
+                self._last = now
+        if due:
+            asyncio.run_coroutine_threadsafe(self._send(), self._loop)
+
+    async def _send(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            progress = self.progress
+        if not pending or self.ctx is None:
+            return
+        message = self.sep.join(pending)
+        await self.ctx.report_progress(progress=progress, total=self.total, message=message)
+
+    async def aclose(self) -> None:
+        await self._send()
+
+
+def _bifrost_chat_stream(
+    *,
+    model: str,
+    messages: list[dict[str, Any]],
+    max_tokens: int,
+    temperature: float,
+    on_delta: Any = None,
+) -> dict[str, Any]:
+    """
+    Streaming counterpart of `_bifrost_chat_completions`.
+
+    Retries and the circuit breaker follow the same rules (no hedging), but only until the first
+    byte of a successful response: once tokens have been forwarded a failure is raised rather than
+    replayed. ``on_delta(text, chunks)`` is called from this thread with each content fragment.
+    """
+    url, headers = _bifrost_endpoint(model)
+    payload = _bifrost_payload(model, messages, max_tokens, temperature)
+    payload["stream"] = True
+    payload["stream_options"] = {"include_usage": True}
+    breaker = _bifrost_breaker(model)
+    probing = breaker.before(model)
+    last_detail, last_exc = "", None
+    try:
+        for attempt in range(3):
+            result = _bifrost_stream_attempt(
+                model, url, headers, payload, attempt=attempt, on_delta=on_delta
+            )
+            if isinstance(result, dict):
+                return result
+            if result is not None:
+                last_detail, last_exc = result
+    except _BifrostUpstreamError:
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    finally:
+        if probing:
+            breaker.release_probe()
+
+    # Only reachable when the last attempt was spent dropping an unsupported temperature.
+    raise _BifrostUpstreamError(
+        f"Bifrost failed after retries: {last_detail or 'model rejected temperature'}"
+    ) from last_exc
+
+
+def _bifrost_stream_attempt(
+    model: str,
+    url: str,
+    headers: dict[str, str],
+    payload: dict[str, Any],
+    *,
+    attempt: int,
+    on_delta: Any,
+) -> dict[str, Any] | tuple[str, Exception | None] | None:
+    """
+    One streaming attempt: the result dict, (detail, exc) after a retryable failure, or None
+    after the model rejected temperature (the payload no longer carries it).
+    """
+    started = time.perf_counter()
+    try:
+        resp = _http_request(
+            "POST", url, json_body=payload, headers=headers, timeout=90, stream=True
+        )
+    except httpx.TransportError as e:
+        _bifrost_retry_or_raise(model, payload, code=0, detail=str(e), attempt=attempt)
+        return str(e), e
+    with contextlib.closing(resp):
+        if resp.status_code >= 400:
+            detail = resp.read().decode("utf-8", errors="replace")
+            had_temperature = "temperature" in payload
+            _bifrost_retry_or_raise(
+                model, payload, code=resp.status_code, detail=detail, attempt=attempt
+            )
+            if had_temperature and "temperature" not in payload:
+                return None
+            return f"HTTP {resp.status_code}: {detail}", None
+        _bifrost_breaker(model).record_success()
+
+        parts: list[str] = []
+        chunks = 0
+        first_token_at: float | None = None
+        finish_reason = None
+        usage: dict[str, Any] | None = None
+        response_model = None
+        for _, data in _iter_sse(resp):
+            if data.strip() == "[DONE]":
+                break
+            try:
+                event = json.loads(data)
+            except ValueError:
+                continue
+            if isinstance(event.get("error"), dict | str):
+                raise RuntimeError(f"Bifrost stream error: {event['error']}")
+            response_model = event.get("model") or response_model
+            if isinstance(event.get("usage"), dict):
+                usage = event["usage"]
+            for choice in event.get("choices") or []:
+                finish_reason = choice.get("finish_reason") or finish_reason
+                text = (choice.get("delta") or {}).get("content")
+                if not text:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(text)
+                chunks += 1
+                if on_delta is not None:
+                    on_delta(text, chunks)
+        finished = time.perf_counter()
+
+    completion_tokens = int((usage or {}).get("completion_tokens") or 0) or chunks
+    generation_s = finished - first_token_at if first_token_at is not None else 0.0
+    return {
+        "assistant_text": "".join(parts),
+        "finish_reason": finish_reason,
+        "usage": usage,
+        "response_model": response_model,
+        "chunks": chunks,
+        "ttft_ms": round((first_token_at - started) * 1000, 1)
+        if first_token_at is not None
+        else None,
+        "total_ms": round((finished - started) * 1000, 1),
+        "completion_tokens": completion_tokens,
+        "tokens_estimated": not (usage or {}).get("completion_tokens"),
+        "tokens_per_s": round(completion_tokens / generation_s, 2) if generation_s > 0 else None,
+    }
+
+
+def _langgraph_base_url() -> str:
+    return (_env("SIRVIST_LANGGRAPH_URL", _env("LANGGRAPH_URL", "http://localhost:2024"))).rstrip(
+        "/"
+    )
+
+
+def _http_json(method: str, url: str, payload: dict[str, Any] | None) -> Any:
+    resp = _http_request(method, url, json_body=payload, timeout=30)
+    if resp.status_code >= 400:
+        raise RuntimeError(f"HTTP {resp.status_code}: {resp.text}")
+    raw = resp.text
+    return json.loads(raw) if raw.strip() else {}
+
+
+def _langgraph_run_payload(input_json: str, config_json: str | None) -> dict[str, Any]:
+    # assistant_id is filled in by `_with_assistant` once graph_id (if any) is resolved.
+    payload: dict[str, Any] = {"input": json.loads(input_json)}
+    if config_json:
+        cfg = json.loads(config_json)
+        if not isinstance(cfg, dict):
+            raise ValueError("config_json must decode to a JSON object")
+        payload["config"] = cfg
+    return payload
+
+
+def _langgraph_stream_run(
+    url: str, payload: dict[str, Any], *, deadline_s: float, on_event: Any = None
+) -> dict[str, Any]:
+    """
+    Consume a LangGraph /runs/stream SSE response until the run ends or `deadline_s` passes.
+
+    Keeps only the latest payload per stream mode (the last `values` event is the final state),
+    so memory stays flat however long the run streams. `on_event(event, data, count)` is called
+    from this thread for every event.
+    """
+    started = time.perf_counter()
+    result: dict[str, Any] = {
+        "run_id": None,
+        "status": "success",
+        "final": None,
+        "last": {},
+        "event_counts": {},
+    }
+    first_event_at: float | None = None
+    deadline_hit = threading.Event()
+    resp = _http_request("POST", url, json_body=payload, timeout=deadline_s, stream=True)
+    # A silent stream would otherwise block in iter_lines past the deadline; closing the
+    # response from the timer thread unblocks the read.
+    timer = threading.Timer(deadline_s, lambda: (deadline_hit.set(), resp.close()))
+    timer.daemon = True
+    timer.start()
+    try:
+        if resp.status_code >= 400:
+            detail = resp.read().decode("utf-8", errors="replace")
+            raise RuntimeError(f"HTTP {resp.status_code}: {detail}")
+        for count, (event, raw) in enumerate(_iter_sse(resp), start=1):
+            try:
+                data = json.loads(raw) if raw.strip() else None
+            except ValueError:
+                data = raw
+            if first_event_at is None:
+                first_event_at = time.perf_counter()
+            # Subgraph events arrive as "<mode>|<namespace>".
+            mode = event.split("|", 1)[0]
+            result["event_counts"][mode] = result["event_counts"].get(mode, 0) + 1
+            if mode == "metadata" and isinstance(data, dict):
+                result["run_id"] = data.get("run_id") or result["run_id"]
+            elif mode == "error":
+                result["status"] = "error"
+                result["error"] = data
+            elif mode != "end":
+                result["last"][event] = data
+                if event == "values":
+                    result["final"] = data
+            if on_event is not None:
+                on_event(event, data, count)
+            if mode == "end":
+                break
+    except (httpx.StreamError, httpx.TransportError):
+        if not deadline_hit.is_set():
+            raise
+    finally:
+        timer.cancel()
+        resp.close()
+    if deadline_hit.is_set():
+        result["status"] = "deadline"
+    result["first_event_ms"] = (
+        round((first_event_at - started) * 1000, 1) if first_event_at is not None else None
+    )
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+_LANGGRAPH_POOL = ThreadPoolExecutor(
+    max_workers=max(1, _int_env("SIRVIST_LANGGRAPH_CONCURRENCY", 8)),
+    thread_name_prefix="langgraph",
+)
+_LANGGRAPH_TERMINAL_STATUSES = frozenset({"success", "error", "timeout", "interrupted"})
+
+
+def _iso_seconds(value: Any) -> float | None:
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _run_duration_s(run: dict[str, Any]) -> float | None:
+    created, updated = _iso_seconds(run.get("created_at")), _iso_seconds(run.get("updated_at"))
+    if created is None or updated is None:
+        return None
+    return round(max(0.0, updated - created), 3)
+
+
+def _langgraph_join(
+    pairs: list[tuple[str, str]], *, target: int, deadline_s: float
+) -> list[dict[str, Any]]:
+    """
+    Poll GET /threads/{thread_id}/runs/{run_id} for every pair concurrently until `target` runs
+    reach a terminal status or `deadline_s` passes.
+
+    Each run has its own interval: it grows while the status stays the same and drops back to
+    the minimum when the status moves, so busy runs are checked often and idle ones back off.
+    Only terminal statuses count toward `target`. Runs that 404 (`missing`) or keep failing
+    (`gave_up`) stop being polled but are not counted as done.
+    """
+    base = _langgraph_base_url()
+    min_s = _float_env("SIRVIST_LANGGRAPH_POLL_MIN_S", 0.25)
+    max_s = _float_env("SIRVIST_LANGGRAPH_POLL_MAX_S", 5.0)
+    started = time.monotonic()
+    deadline = started + deadline_s
+    states = [
+        {
+            "thread_id": t,
+            "run_id": r,
+            "status": None,
+            "done": False,
+            "gave_up": False,
+            "missing": False,
+            "polls": 0,
+            "errors": 0,
+            "interval": min_s,
+            "next_at": started,
+        }
+        for t, r in pairs
+    ]
+    inflight: dict[Any, dict[str, Any]] = {}
+    done_count = 0
+    while done_count < target:
+        now = time.monotonic()
+        active = [st for st in states if not st["done"] and not st["gave_up"]]
+        if now >= deadline or not active:
+            break
+        polling = {id(st) for st in inflight.values()}
+        for st in active:
+            if st["next_at"] <= now and id(st) not in polling:
+                url = f"{base}/threads/{st['thread_id']}/runs/{st['run_id']}"
+                inflight[_LANGGRAPH_POOL.submit(_http_json, "GET", url, None)] = st
+        polling = {id(st) for st in inflight.values()}
+        due = [st["next_at"] for st in active if id(st) not in polling]
+        timeout = max(0.0, min([deadline, *due]) - now)
+        if not inflight:
+            time.sleep(timeout)
+            continue
+        finished, _ = wait_futures(list(inflight), timeout=timeout, return_when=FIRST_COMPLETED)
+        for fut in finished:
+            st = inflight.pop(fut)
+            st["polls"] += 1
+            now = time.monotonic()
+            try:
+                run = fut.result()
+            except Exception as e:
+                st["errors"] += 1
+                st["error"] = str(e)
+                # Unknown runs never appear; transient failures get a few more tries.
+                st["missing"] = str(e).startswith("HTTP 404")
+                if st["missing"] or st["errors"] >= 5:
+                    st["gave_up"] = True
+                    continue
+                st["interval"] = min(max_s, st["interval"] * 2)
+            else:
+                st.pop("error", None)
+                st["errors"] = 0
+                status = str(run.get("status") or "") if isinstance(run, dict) else ""
+                changed = status != st["status"]
+                st["status"] = status or None
+                if status in _LANGGRAPH_TERMINAL_STATUSES:
+                    st["done"] = True
+                    st["observed_s"] = round(now - started, 3)
+                    st["duration_s"] = _run_duration_s(run)
+                    done_count += 1
+                    continue
+                st["interval"] = min_s if changed else min(max_s, st["interval"] * 1.6)
+            st["next_at"] = now + st["interval"] * random.uniform(0.8, 1.2)
+    for fut in inflight:
+        fut.cancel()
+    return [
+        {k: v for k, v in st.items() if k not in {"interval", "next_at", "errors"}} for st in states
+    ]
+
+
+def _bounded_map(pool: ThreadPoolExecutor, fn: Any, items: list[Any], limit: int) -> list[Any]:
+    """
+    Run `fn` over `items` on a shared pool with at most `limit` in flight, keeping input order.
+
+    Failures come back as the exception object in that slot rather than aborting the rest.
+    """
+    results: list[Any] = [None] * len(items)
+    inflight: dict[Any, int] = {}
+    queue = iter(enumerate(items))
+    while True:
+        for index, item in queue:
+            inflight[pool.submit(fn, item)] = index
+            if len(inflight) >= limit:
+                break
+        if not inflight:
+            return results
+        finished, _ = wait_futures(list(inflight), return_when=FIRST_COMPLETED)
+        for fut in finished:
+            index = inflight.pop(fut)
+            exc = fut.exception()
+            results[index] = exc if exc is not None else fut.result()
+
+
+def _parse_time_bound(name: str, value: str | None) -> float | None:
+    if not value:
+        return None
+    ts = _iso_seconds(value)
+    if ts is None:
+        raise ValueError(f"{name} must be an ISO-8601 timestamp (e.g. 2026-01-31T12:00:00Z)")
+    return ts
+
+
+async def _langgraph_stream_tool(
+    ctx: Context | None,
+    path: str,
+    payload: dict[str, Any],
+    *,
+    assistant_id: str | None,
+    graph_id: str | None,
+    stream_mode: str,
+    deadline_s: float,
+) -> dict[str, Any]:
+    modes = [m.strip() for m in (stream_mode or "").split(",") if m.strip()] or ["values"]
+    payload["stream_mode"] = modes
+    deadline = max(1.0, min(3600.0, float(deadline_s)))
+    relay = _ProgressRelay(
+        ctx, interval_s=_float_env("SIRVIST_LANGGRAPH_PROGRESS_INTERVAL_S", 0.5), sep="\n"
+    )
+
+    def on_event(event: str, data: Any, count: int) -> None:
+        relay.emit(count, f"{event}: {json.dumps(data, ensure_ascii=False, default=str)[:500]}")
+
+    url = f"{_langgraph_base_url()}{path}"
+    result = await _run_in_tool_pool(
+        _with_assistant,
+        assistant_id,
+        graph_id,
+        lambda aid: _langgraph_stream_run(
+            url, {**payload, "assistant_id": aid}, deadline_s=deadline, on_event=on_event
+        ),
+    )
+    await relay.aclose()
+    return {"stream_mode": modes, **result}
+
+
+class _LruTtlCache:
+    """
+    Thread-safe in-process cache with per-entry TTL, LRU eviction and an optional byte budget.
+
+    Sizes are supplied by the caller (typically the length of the serialized value), so the
+    budget is an estimate of payload size rather than exact memory usage.
+    """
+
+    def __init__(self, *, ttl_s: float, max_entries: int, max_bytes: int = 0) -> None:
+        self.ttl_s = float(ttl_s)
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._data: OrderedDict[Any, tuple[float, int, Any]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any) -> Any | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: Any, value: Any, *, size: int = 0, ttl_s: float | None = None) -> bool:
+        """Store `value`; `ttl_s` shortens the lifetime below the cache default (never extends)."""
+        ttl = self.ttl_s if ttl_s is None else min(self.ttl_s, float(ttl_s))
+        if ttl <= 0 or (self.max_bytes and size > self.max_bytes):
+            return False
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (
+                self.max_bytes and self._bytes > self.max_bytes
+            ):
+                self._drop(next(iter(self._data)))
+        return True
+
+    def pop(self, key: Any) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def clear(self) -> int:
+        with self._lock:
+            n = len(self._data)
+            self._data.clear()
+            self._bytes = 0
+            return n
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _drop(self, key: Any) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+
+class _SqliteCache:
+    """
+    Persistent JSON value cache in a single SQLite file, shared across server restarts.
+
+    Entries older than `max_age_s` are dropped; when the stored payload exceeds `max_bytes`, the
+    least recently accessed entries are evicted first. SQLite errors (read-only disk, corrupt
+    file) degrade to cache misses rather than failing the tool call.
+    """
+
+    def __init__(self, path: Path, *, max_bytes: int, max_age_s: float) -> None:
+        self.path = path
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_age_s = float(max_age_s)
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries(accessed_at)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> tuple[Any, float] | None:
+        """Return (value, age_s) or None."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value, created_at FROM cache_entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                age = now - float(row[1])
+                if age > self.max_age_s:
+                    conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+            return json.loads(row[0]), age
+        except (sqlite3.Error, ValueError):
+            return None
+
+    def put(self, key: str, value: Any, *, created_at: float | None = None) -> bool:
+        text = json.dumps(value, ensure_ascii=False)
+        size = len(text.encode("utf-8"))
+        if self.max_bytes and size > self.max_bytes:
+            return False
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries "
+                    "(key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, text, size, created_at or now, now),
+                )
+                self._evict(conn, now)
+            return True
+        except sqlite3.Error:
+            return False
+
+    def clear(self) -> None:
+        with self._lock, contextlib.suppress(sqlite3.Error):
+            self._connect().execute("DELETE FROM cache_entries")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM cache_entries WHERE created_at < ?", (now - self.max_age_s,))
+        if not self.max_bytes:
+            return
+        total = int(conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0])
+        if total <= self.max_bytes:
+            return
+        doomed: list[str] = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM cache_entries ORDER BY accessed_at ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            doomed.append(key)
+            total -= int(size)
+        conn.executemany("DELETE FROM cache_entries WHERE key = ?", [(k,) for k in doomed])
+
+
+class _TieredCache:
+    """In-memory LRU in front of a `_SqliteCache`; both tiers keep the original creation time."""
+
+    def __init__(self, *, memory_entries: int, max_age_s: float, disk: _SqliteCache) -> None:
+        self.max_age_s = float(max_age_s)
+        self.memory = _LruTtlCache(ttl_s=max_age_s, max_entries=memory_entries)
+        self.disk = disk
+
+    def get(self, key: str) -> tuple[Any, float] | None:
+        """Return (value, age_s) or None. Disk hits are promoted into memory."""
+        hit = self.memory.get(key)
+        if hit is not None:
+            value, created_at = hit
+            return value, time.time() - created_at
+        got = self.disk.get(key)
+        if got is not None:
+            # Only the remaining lifetime carries over, so a promoted entry cannot outlive max_age.
+            value, age = got
+            self.memory.put(key, (value, time.time() - age), ttl_s=self.max_age_s - age)
+        return got
+
+    def put(self, key: str, value: Any) -> None:
+        created_at = time.time()
+        self.memory.put(key, (value, created_at))
+        self.disk.put(key, value, created_at=created_at)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.disk.clear()
+
+
+def _as_dict(value: Any, *, list_key: str = "items") -> dict[str, Any]:
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, list):
+        return {list_key: value, "count": len(value)}
+    return {"value": value}
+
+
+_CYPHER_TOKEN_RE = re.compile(
+    r"""
+    (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+    |(?P<string>'(?:[^'\\]|\\.)*'?|"(?:[^"\\]|\\.)*"?)
+    |(?P<ident>`(?:[^`]|``)*`?)
+    |(?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<number>\d[\w.]*)
+    |(?P<space>\s+)
+    |(?P<punct>.)
+    """,
+    flags=re.VERBOSE | re.DOTALL,
+)
+
+# Clause keywords that make a statement non-read-only. DETACH DELETE is covered by DELETE.
+_CYPHER_WRITE_WORDS = frozenset({"CREATE", "MERGE", "DELETE", "SET", "DROP", "REMOVE"})
+# Procedures that run caller-supplied Cypher or mutate the graph without a write keyword in
+# their own name (e.g. `apoc.cypher.doIt('CREATE ...')`, `apoc.periodic.iterate(...)`).
+_CYPHER_WRITE_PROC_PREFIXES = (
+    "APOC.CYPHER.",
+    "APOC.PERIODIC.",
+    "APOC.DO.",
+    "APOC.REFACTOR.",
+    "APOC.TRIGGER.",
+    "APOC.ATOMIC.",
+    "APOC.LOCK.",
+)
+_CYPHER_WRITE_PROC_NAMES = frozenset({"DOIT", "RUNWRITE", "RUNSCHEMA", "RUNMANY", "RUNFILE"})
+_CYPHER_SCHEMA_OBJECTS = {
+    "CREATE": {"CONSTRAINT", "INDEX"},
+    "DROP": {"CONSTRAINT", "INDEX"},
+    "SHOW": {"CONSTRAINTS", "INDEXES"},
+}
+
+
+class _CypherVerdict(NamedTuple):
+    empty: bool
+    # First construct that disqualifies the statement as read-only, if any.
+    write_reason: str | None
+    # First write that is not a constraint/index operation, if any.
+    non_schema_write: str | None
+    # Leading schema form ("CREATE INDEX", "SHOW CONSTRAINTS", "CALL db.indexes", ...), if any.
+    schema_op: str | None
+    has_top_level_limit: bool
+
+    @property
+    def kind(self) -> str:
+        if self.schema_op:
+            return "schema"
+        return "write" if self.write_reason else "read"
+
+    @property
+    def is_ddl(self) -> bool:
+        return bool(self.schema_op) and self.schema_op.split()[0] in {"CREATE", "DROP"}
+
+
+@functools.lru_cache(maxsize=1024)
+def _classify_cypher(query: str) -> _CypherVerdict:
+    """
+    Classify a Cypher statement in one lexical pass.
+
+    Comments, string literals and backtick identifiers are opaque, so keywords inside them never
+    trigger the guards. Words used as property keys, labels, map keys or parameters are ignored,
+    but every segment of a CALLed procedure name is checked, backticked or not (e.g.
+    `apoc.create.node`), and procedures that execute arbitrary Cypher (`apoc.cypher.*`,
+    `apoc.periodic.*`, `*.doIt`) count as writes. Read paths also open READ_ACCESS sessions as a
+    second line of defence.
+    """
+    tokens: list[tuple[str, str]] = []
+    for m in _CYPHER_TOKEN_RE.finditer(query):
+        kind = m.lastgroup or "punct"
+        if kind in {"comment", "space"}:
+            continue
+        text = m.group()
+        tokens.append((kind, text.upper() if kind == "word" else text))
+    if not tokens:
+        return _CypherVerdict(True, None, None, None, False)
+
+    def word(idx: int) -> str | None:
+        if 0 <= idx < len(tokens) and tokens[idx][0] == "word":
+            return tokens[idx][1]
+        return None
+
+    def punct(idx: int) -> str | None:
+        if 0 <= idx < len(tokens) and tokens[idx][0] == "punct":
+            return tokens[idx][1]
+        return None
+
+    def name_parts(idx: int) -> list[str] | None:
+        # A procedure name segment is a bare word or a backtick identifier; the latter may hold
+        # dots itself (`apoc.cypher.doIt` names the same procedure as apoc.cypher.doIt).
+        if not 0 <= idx < len(tokens):
+            return None
+        kind, text = tokens[idx]
+        if kind == "word":
+            return [text]
+        if kind == "ident":
+            inner = text[1:-1] if len(text) > 1 and text.endswith("`") else text[1:]
+            return inner.replace("``", "`").upper().split(".")
+        return None
+
+    schema_op: str | None = None
+    first = word(0)
+    if first in _CYPHER_SCHEMA_OBJECTS and word(1) in _CYPHER_SCHEMA_OBJECTS[first]:
+        schema_op = f"{first} {word(1)}"
+
+    write_reason: str | None = None
+    non_schema_write: str | None = None
+    has_limit = False
+    depth = 0
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if kind == "punct":
+            if text in "([{":
+                depth += 1
+            elif text in ")]}":
+                depth = max(0, depth - 1)
+            i += 1
+            continue
+        if kind != "word" or punct(i - 1) in {".", ":", "$"} or punct(i + 1) == ":":
+            i += 1
+            continue
+
+        if text == "CALL" and name_parts(i + 1):
+            at_start = i == 0
+            segments = name_parts(i + 1) or []
+            i += 2
+            while punct(i) == "." and name_parts(i + 1):
+                segments.extend(name_parts(i + 1) or [])
+                i += 2
+            name = ".".join(segments)
+            if at_start and name in {"DB.CONSTRAINTS", "DB.INDEXES"}:
+                schema_op = f"CALL {name.lower()}"
+            schema_proc = name.startswith(("DB.INDEX.", "DB.CONSTRAINTS."))
+            if (
+                schema_proc
+                or _CYPHER_WRITE_WORDS.intersection(segments)
+                or _CYPHER_WRITE_PROC_NAMES.intersection(segments)
+                or name.startswith(_CYPHER_WRITE_PROC_PREFIXES)
+            ):
+                write_reason = write_reason or f"CALL {name.lower()}"
+                if not schema_proc:
+                    non_schema_write = non_schema_write or f"CALL {name.lower()}"
+            continue
+
+        if text in _CYPHER_WRITE_WORDS or (text == "LOAD" and word(i + 1) == "CSV"):
+            write_reason = write_reason or text
+            if not (text in {"CREATE", "DROP"} and word(i + 1) in {"CONSTRAINT", "INDEX"}):
+                non_schema_write = non_schema_write or text
+        elif text == "UNION" and depth == 0:
+            # A LIMIT before a top-level UNION only caps that branch.
+            has_limit = False
+        elif text == "LIMIT" and depth == 0:
+            has_limit = True
+        i += 1
+
+    return _CypherVerdict(False, write_reason, non_schema_write, schema_op, has_limit)
+
+
+def _ensure_readonly(query: str) -> _CypherVerdict:
+    verdict = _classify_cypher(query.strip())
+    if verdict.empty:
+        raise ValueError("Empty Cypher query")
+    # Allow CALL ... RETURN style procedures, but block obvious writes.
+    if verdict.write_reason:
+        raise ValueError("Only read-only Cypher is allowed by this MCP tool.")
+    return verdict
+
+
+def _ensure_schema_only(query: str) -> _CypherVerdict:
+    verdict = _classify_cypher(query.strip())
+    if verdict.empty:
+        raise ValueError("Empty Cypher query")
+    # Only allow schema operations (constraints/indexes) and introspection.
+    if not verdict.schema_op:
+        raise ValueError("Only schema/index/constraint operations are allowed by this MCP tool.")
+    # Extra safety: reject non-schema writes even if mixed in.
+    if verdict.non_schema_write:
+        raise ValueError("Non-schema writes are not allowed by this MCP tool.")
+    return verdict
+
+
+_NEO4J_CURSORS_LOCK = threading.Lock()
+_NEO4J_CURSORS: dict[str, dict[str, Any]] = {}
+_NEO4J_CURSOR_REAPER: threading.Thread | None = None
+
+
+def _close_neo4j_cursor(entry: dict[str, Any]) -> None:
+    with entry["lock"]:
+        with contextlib.suppress(Exception):
+            if entry["session"] is not None:
+                entry["session"].close()
+        driver, entry["driver"] = entry["driver"], None
+    # The cursor held its driver so a settings swap could not close it under the open session.
+    if driver is not None:
+        _release_neo4j_driver(driver)
+
+
+def _reap_neo4j_cursors(*, close_all: bool = False) -> None:
+    now = time.monotonic()
+    with _NEO4J_CURSORS_LOCK:
+        expired = [
+            tok
+            for tok, entry in _NEO4J_CURSORS.items()
+            if close_all or (entry["result"] is not None and entry["expires_at"] <= now)
+        ]
+        entries = [_NEO4J_CURSORS.pop(tok) for tok in expired]
+    for entry in entries:
+        _close_neo4j_cursor(entry)
+
+
+# Registered after the driver hook so it runs first (atexit is LIFO).
+atexit.register(_reap_neo4j_cursors, close_all=True)
+
+
+def _neo4j_cursor_reaper_loop() -> None:
+    global _NEO4J_CURSOR_REAPER
+    while True:
+        time.sleep(max(1.0, _float_env("SIRVIST_NEO4J_CURSOR_TTL_S", 120.0) / 4))
+        _reap_neo4j_cursors()
+        with _NEO4J_CURSORS_LOCK:
+            if not _NEO4J_CURSORS:
+                _NEO4J_CURSOR_REAPER = None
+                return
+
+
+def _ensure_neo4j_cursor_reaper() -> None:
+    # Caller holds _NEO4J_CURSORS_LOCK. The thread exits once no cursors remain, so idle
+    # sessions are released even when no further neo4j_query calls arrive.
+    global _NEO4J_CURSOR_REAPER
+    if _NEO4J_CURSOR_REAPER is None:
+        _NEO4J_CURSOR_REAPER = threading.Thread(
+            target=_neo4j_cursor_reaper_loop, name="neo4j-cursor-reaper", daemon=True
+        )
+        _NEO4J_CURSOR_REAPER.start()
+
+
+def _neo4j_cursor_page(
+    token: str,
+    entry: dict[str, Any],
+    page_size: int,
+    *,
+    tool: str = "neo4j_query.next",
+    started: float | None = None,
+) -> dict[str, Any]:
+    try:
+        with (
+            entry["lock"],
+            _timed_neo4j_call(
+                tool=tool, query=entry["query"], params=entry["params"], started=started
+            ) as stats,
+        ):
+            result = entry["result"]
+            rows = stats["rows"] = [record.data() for record in result.fetch(page_size)]
+            has_more = len(rows) == page_size and result.peek() is not None
+            entry["rows_served"] += len(rows)
+            rows_served = entry["rows_served"]
+    except Exception:
+        with _NEO4J_CURSORS_LOCK:
+            _NEO4J_CURSORS.pop(token, None)
+        _close_neo4j_cursor(entry)
+        raise
+
+    if not has_more:
+        with _NEO4J_CURSORS_LOCK:
+            _NEO4J_CURSORS.pop(token, None)
+        _close_neo4j_cursor(entry)
+    return {
+        "rows": rows,
+        "row_count": len(rows),
+        "rows_served": rows_served,
+        "has_more": has_more,
+        "cursor": token if has_more else None,
+    }
+
+
+def _open_neo4j_cursor(query: str, params: dict[str, Any], page_size: int) -> dict[str, Any]:
+    """
+    Run `query` and keep its result stream open server-side behind an opaque cursor token.
+
+    Records are pulled from Neo4j in `page_size` batches, so server memory stays flat no matter
+    how large the result is. Idle cursors are closed after SIRVIST_NEO4J_CURSOR_TTL_S seconds.
+    """
+    _reap_neo4j_cursors()
+    max_cursors = max(1, _int_env("SIRVIST_NEO4J_MAX_CURSORS", 16))
+    token = secrets.token_urlsafe(18)
+    entry: dict[str, Any] = {
+        "driver": None,
+        "session": None,
+        "result": None,
+        "lock": threading.Lock(),
+        "rows_served": 0,
+        "expires_at": 0.0,
+        "query": query,
+        "params": params,
+    }
+    # Reserve the slot before opening the session so concurrent calls cannot overshoot the cap.
+    with _NEO4J_CURSORS_LOCK:
+        if len(_NEO4J_CURSORS) >= max_cursors:
+            raise RuntimeError(
+                f"Too many open neo4j_query cursors ({max_cursors}). "
+                "Drain or close an existing cursor first."
+            )
+        _NEO4J_CURSORS[token] = entry
+
+    driver = None
+    try:
+        driver = _hold_neo4j_driver(repo_root)
+        session = driver.session(default_access_mode=READ_ACCESS, fetch_size=page_size)
+        try:
+            started = time.perf_counter()
+            result = session.run(query, **params)
+        except Exception:
+            session.close()
+            raise
+    except Exception:
+        with _NEO4J_CURSORS_LOCK:
+            _NEO4J_CURSORS.pop(token, None)
+        if driver is not None:
+            _release_neo4j_driver(driver)
+        raise
+
+    with _NEO4J_CURSORS_LOCK:
+        entry["driver"] = driver
+        entry["session"] = session
+        entry["result"] = result
+        entry["expires_at"] = time.monotonic() + _float_env("SIRVIST_NEO4J_CURSOR_TTL_S", 120.0)
+        _ensure_neo4j_cursor_reaper()
+    # The first page is timed from RUN so its slow-query entry covers the whole round trip.
+    return _neo4j_cursor_page(token, entry, page_size, tool="neo4j_query", started=started)
+
+
+def _validate_page_size(page_size: int) -> int:
+    if page_size <= 0 or page_size > 2000:
+        raise ValueError("page_size must be between 1 and 2000")
+    return int(page_size)
+
+
+_NEO4J_RESULT_CACHE = _LruTtlCache(
+    ttl_s=_float_env("SIRVIST_NEO4J_CACHE_TTL_S", 60.0),
+    max_entries=_int_env("SIRVIST_NEO4J_CACHE_MAX_ENTRIES", 256),
+    max_bytes=_int_env("SIRVIST_NEO4J_CACHE_MAX_BYTES", 8_000_000),
+)
+
+
+# Quoted strings/identifiers are matched first so whitespace inside them is preserved.
+_CYPHER_WS_RE = re.compile(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`)|\s+""")
+
+
+def _neo4j_cache_key(query: str, params: dict[str, Any], limit: int) -> tuple[str, str, int]:
+    normalized = _CYPHER_WS_RE.sub(lambda m: m.group(1) or " ", query).strip()
+    canonical_params = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return (normalized, canonical_params, int(limit))
+
+
+def _prepare_read_query(query: str, limit: int) -> str:
+    verdict = _ensure_readonly(query)
+    if limit <= 0 or limit > 2000:
+        raise ValueError("limit must be between 1 and 2000")
+    # Best-effort cap to avoid huge payloads; only apply if query has no top-level LIMIT.
+    if verdict.has_top_level_limit:
+        return query
+    return f"{query.rstrip()}\nLIMIT {limit}"
+
+
+_SLOW_QUERY_LOGGER_LOCK = threading.Lock()
+
+
+def _slow_query_logger() -> logging.Logger:
+    logger = logging.getLogger("sirvist.neo4j.slow_queries")
+    with _SLOW_QUERY_LOGGER_LOCK:
+        if not logger.handlers:
+            log_path = Path(
+                _env("SIRVIST_NEO4J_SLOW_QUERY_LOG", str(state_dir() / "neo4j_slow_queries.jsonl"))
+            )
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                log_path,
+                maxBytes=max(1, _int_env("SIRVIST_NEO4J_SLOW_QUERY_LOG_MAX_BYTES", 5_000_000)),
+                backupCount=max(1, _int_env("SIRVIST_NEO4J_SLOW_QUERY_LOG_BACKUPS", 3)),
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+def _cypher_fingerprint(query: str) -> str:
+    # Literal values are masked so the same query shape with different constants groups together.
+    parts: list[str] = []
+    for m in _CYPHER_TOKEN_RE.finditer(query):
+        kind = m.lastgroup or "punct"
+        if kind in {"comment", "space"}:
+            continue
+        parts.append("?" if kind in {"string", "number"} else m.group())
+    return " ".join(parts)
+
+
+def _log_slow_query(
+    *,
+    tool: str,
+    query: str,
+    params: dict[str, Any],
+    row_count: int,
+    result_bytes: int,
+    elapsed_s: float,
+    error: str | None = None,
+) -> None:
+    shape = _cypher_fingerprint(query)
+    record: dict[str, Any] = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "tool": tool,
+        "fingerprint": hashlib.sha1(shape.encode("utf-8")).hexdigest()[:16],
+        "query_shape": shape[:500],
+        "params_shape": {k: type(v).__name__ for k, v in sorted(params.items())},
+        "row_count": row_count,
+        "result_bytes": result_bytes,
+        "elapsed_ms": round(elapsed_s * 1000, 2),
+    }
+    if error:
+        record["error"] = error
+    with contextlib.suppress(Exception):
+        _slow_query_logger().info(json.dumps(record, ensure_ascii=False))
+
+
+@contextlib.contextmanager
+def _timed_neo4j_call(
+    *, tool: str, query: str, params: dict[str, Any], started: float | None = None
+) -> Iterator[dict[str, Any]]:
+    """
+    Time a Neo4j call and log it to the slow-query log when it crosses the threshold.
+
+    The caller stores the returned rows in `stats["rows"]`; failed calls are logged too.
+    """
+    stats: dict[str, Any] = {"rows": []}
+    error: str | None = None
+    if started is None:
+        started = time.perf_counter()
+    try:
+        yield stats
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
     finally:
-        driver.close()
+        elapsed_s = time.perf_counter() - started
+        threshold_ms = _float_env("SIRVIST_NEO4J_SLOW_QUERY_MS", 1000.0)
+        if threshold_ms > 0 and elapsed_s * 1000 >= threshold_ms:
+            rows = stats["rows"]
+            _log_slow_query(
+                tool=tool,
+                query=query,
+                params=params,
+                row_count=len(rows),
+                result_bytes=len(json.dumps(rows, ensure_ascii=False, default=str)),
+                elapsed_s=elapsed_s,
+                error=error,
+            )
+
+
+def _neo4j_rows_response(
+    cache_key: tuple[str, str, int], rows: list[dict[str, Any]], *, use_cache: bool
+) -> dict[str, Any]:
+    if use_cache:
+        size = len(json.dumps(rows, ensure_ascii=False, default=str))
+        _NEO4J_RESULT_CACHE.put(cache_key, rows, size=size)
+    return {"rows": rows, "row_count": len(rows), "cache": "miss" if use_cache else "bypass"}
+
+
+def _compact_plan(plan: dict[str, Any] | None) -> list[dict[str, Any]]:
+    """Flatten a PROFILE/EXPLAIN plan tree into one row per operator (depth-first)."""
+    operators: list[dict[str, Any]] = []
+    stack: list[tuple[int, dict[str, Any]]] = [(0, plan)] if isinstance(plan, dict) else []
+    while stack and len(operators) < 100:
+        depth, node = stack.pop()
+        args = node.get("args") or node.get("arguments") or {}
+        op: dict[str, Any] = {
+            "depth": depth,
+            "operator": node.get("operatorType") or node.get("operator_type"),
+            "details": args.get("Details"),
+            "estimated_rows": args.get("EstimatedRows"),
+        }
+        for out_key, keys in {
+            "rows": ("rows", "Rows"),
+            "db_hits": ("dbHits", "db_hits", "DbHits"),
+            "time_ms": ("time", "Time"),
+        }.items():
+            value = next((v for k in keys if (v := node.get(k, args.get(k))) is not None), None)
+            if value is not None:
+                op[out_key] = round(value / 1_000_000, 3) if out_key == "time_ms" else value
+        operators.append(op)
+        children = [c for c in node.get("children") or [] if isinstance(c, dict)]
+        stack.extend((depth + 1, c) for c in reversed(children))
+    return operators
+
+
+def _run_profiled(capped_query: str, params: dict[str, Any], mode: str) -> dict[str, Any]:
+    driver = _neo4j_driver(repo_root)
+    with (
+        _timed_neo4j_call(tool=f"neo4j_query.{mode}", query=capped_query, params=params) as stats,
+        driver.session(default_access_mode=READ_ACCESS) as session,
+    ):
+        result = session.run(f"{mode.upper()}\n{capped_query}", **params)
+        rows = stats["rows"] = result.data()
+        summary = result.consume()
+    plan = summary.profile if mode == "profile" else summary.plan
+    operators = _compact_plan(plan)
+    return {
+        "rows": rows,
+        "row_count": len(rows),
+        "cache": "bypass",
+        "plan": {
+            "mode": mode,
+            "operators": operators,
+            "total_db_hits": sum(int(op.get("db_hits") or 0) for op in operators),
+            "result_available_after_ms": summary.result_available_after,
+            "result_consumed_after_ms": summary.result_consumed_after,
+        },
+    }
+
+
+@mcp.tool(
+    name="neo4j_query",
+    description=(
+        "Run a READ-ONLY Cypher query against the local Sirvist Neo4j instance. "
+        "Pass page_size to get the first page plus a cursor for neo4j_query.next. "
+        "Non-paginated results are cached briefly; pass use_cache=false to bypass. "
+        "profile='profile' or 'explain' returns a compact operator plan summary."
+    ),
+)
+@_offloaded
+def neo4j_query(
+    query: str,
+    params_json: str | None = None,
+    limit: int = 200,
+    page_size: int | None = None,
+    use_cache: bool = True,
+    profile: str | None = None,
+) -> dict[str, Any]:
+    params: dict[str, Any] = {}
+    if params_json:
+        params = json.loads(params_json)
+        if not isinstance(params, dict):
+            raise ValueError("params_json must decode to a JSON object")
+    capped_query = _prepare_read_query(query, limit)
+
+    if profile:
+        mode = profile.strip().lower()
+        if mode not in {"profile", "explain"}:
+            raise ValueError("profile must be 'profile' or 'explain'")
+        if page_size is not None:
+            raise ValueError("profile cannot be combined with page_size")
+        return _run_profiled(capped_query, params, mode)
+
+    if page_size is not None:
+        return _open_neo4j_cursor(capped_query, params, _validate_page_size(page_size))
+
+    cache_key = _neo4j_cache_key(query, params, limit)
+    if use_cache:
+        cached = _NEO4J_RESULT_CACHE.get(cache_key)
+        if cached is not None:
+            return {"rows": list(cached), "row_count": len(cached), "cache": "hit"}
+
+    driver = _neo4j_driver(repo_root)
+    with (
+        _timed_neo4j_call(tool="neo4j_query", query=capped_query, params=params) as stats,
+        driver.session(default_access_mode=READ_ACCESS) as session,
+    ):
+        rows = stats["rows"] = session.run(capped_query, **params).data()
+    return _neo4j_rows_response(cache_key, rows, use_cache=use_cache)
+
+
+def _neo4j_batch_item(session: Any, item: Any, use_cache: bool) -> dict[str, Any]:
+    if not isinstance(item, dict):
+        raise ValueError("each item must be a JSON object with a 'query' field")
+    query = str(item.get("query") or "")
+    params = item.get("params") or {}
+    if not isinstance(params, dict):
+        raise ValueError("params must be a JSON object")
+    limit = int(item.get("limit") or 200)
+    capped_query = _prepare_read_query(query, limit)
+
+    cache_key = _neo4j_cache_key(query, params, limit)
+    if use_cache:
+        cached = _NEO4J_RESULT_CACHE.get(cache_key)
+        if cached is not None:
+            return {"rows": list(cached), "row_count": len(cached), "cache": "hit"}
+    with _timed_neo4j_call(tool="neo4j_query_batch", query=capped_query, params=params) as stats:
+        rows = stats["rows"] = session.run(capped_query, **params).data()
+    return _neo4j_rows_response(cache_key, rows, use_cache=use_cache)
+
+
+@mcp.tool(
+    name="neo4j_query_batch",
+    description=(
+        "Run up to 50 READ-ONLY Cypher queries in one Neo4j session. items_json is a JSON list "
+        "of {query, params?, limit?}. Each item succeeds or fails independently."
+    ),
+)
+@_offloaded
+def neo4j_query_batch(items_json: str, use_cache: bool = True) -> dict[str, Any]:
+    try:
+        items = json.loads(items_json)
+    except Exception as e:
+        raise ValueError(f"items_json must be valid JSON: {e}") from e
+    if not isinstance(items, list) or not items:
+        raise ValueError("items_json must decode to a non-empty JSON list")
+    if len(items) > 50:
+        raise ValueError("items_json may contain at most 50 items")
+
+    started = time.perf_counter()
+    results: list[dict[str, Any]] = []
+    driver = _neo4j_driver(repo_root)
+    # Auto-commit runs on a single read session: one pooled connection for the whole batch,
+    # while a failing item does not poison a shared transaction for the others.
+    with driver.session(default_access_mode=READ_ACCESS) as session:
+        for index, item in enumerate(items):
+            t0 = time.perf_counter()
+            try:
+                out: dict[str, Any] = {"index": index, "ok": True}
+                out.update(_neo4j_batch_item(session, item, use_cache))
+            except Exception as e:
+                out = {"index": index, "ok": False, "error": f"{type(e).__name__}: {e}"}
+            out["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            results.append(out)
+
+    ok_count = sum(1 for r in results if r["ok"])
+    return {
+        "results": results,
+        "ok_count": ok_count,
+        "error_count": len(results) - ok_count,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+@mcp.tool(
+    name="neo4j_query.next",
+    description=(
+        "Fetch the next page of a paginated neo4j_query result using its cursor token. "
+        "The cursor is released automatically once the result is exhausted."
+    ),
+)
+@_offloaded
+def neo4j_query_next(cursor: str, page_size: int = 200) -> dict[str, Any]:
+    size = _validate_page_size(page_size)
+    _reap_neo4j_cursors()
+    with _NEO4J_CURSORS_LOCK:
+        entry = _NEO4J_CURSORS.get(cursor)
+        if entry is None:
+            raise ValueError("Unknown or expired cursor. Re-run neo4j_query to start over.")
+        entry["expires_at"] = time.monotonic() + _float_env("SIRVIST_NEO4J_CURSOR_TTL_S", 120.0)
+    return _neo4j_cursor_page(cursor, entry, size)
+
+
+@mcp.tool(
+    name="neo4j_query.close",
+    description="Release a paginated neo4j_query cursor before it is exhausted.",
+)
+@_offloaded
+def neo4j_query_close(cursor: str) -> dict[str, Any]:
+    with _NEO4J_CURSORS_LOCK:
+        entry = _NEO4J_CURSORS.pop(cursor, None)
+    if entry is not None:
+        _close_neo4j_cursor(entry)
+    return {"ok": True, "closed": entry is not None}
+
+
+@mcp.tool(
+    name="neo4j_schema",
+    description=(
+        "Run Cypher schema operations ONLY (constraints/indexes) against "
+        "the local Sirvist Neo4j instance."
+    ),
+)
+@_offloaded
+def neo4j_schema(query: str) -> dict[str, Any]:
+    verdict = _ensure_schema_only(query)
+    driver = _neo4j_driver(repo_root)
+    # Only CREATE/DROP need a write transaction; introspection runs read-only.
+    access = WRITE_ACCESS if verdict.is_ddl else READ_ACCESS
+    with driver.session(default_access_mode=access) as session:
+        res = session.run(query)
+        # Consume summary for side-effect queries.
+        summary = res.consume()
+        counters = summary.counters
+    # Any DDL may change what read queries return (e.g. constraint-backed lookups), so flush.
+    flushed = 0
+    if verdict.is_ddl:
+        flushed = _NEO4J_RESULT_CACHE.clear()
+        _invalidate_neo4j_inventory()
+    return {
+        "ok": True,
+        "counters": {
+            "constraints_added": counters.constraints_added,
+            "constraints_removed": counters.constraints_removed,
+            "indexes_added": counters.indexes_added,
+            "indexes_removed": counters.indexes_removed,
+        },
+        "notifications": [n.get("description") for n in (summary.notifications or [])],
+        "cache_flushed": flushed,
+    }
+
+
+_NEO4J_INVENTORY_LOCK = threading.Lock()
+# Serializes inventory reads so inline and background refreshes never race each other.
+_NEO4J_INVENTORY_REFRESH_LOCK = threading.Lock()
+_NEO4J_INVENTORY: dict[str, Any] = {
+    "snapshot": None,
+    "ts": 0.0,
+    "refreshing": False,
+    "schema_dirty": True,
+}
+
+
+def _cypher_name(name: str) -> str:
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def _inventory_from_graph_counts(session: Any) -> dict[str, Any]:
+    # One procedure call answered entirely from the count store (no graph scan).
+    record = session.run("CALL db.stats.retrieve('GRAPH COUNTS') YIELD data RETURN data").single()
+    data = (record["data"] if record else None) or {}
+    node_counts: dict[str, int] = {}
+    total_nodes = 0
+    for row in data.get("nodes") or []:
+        if "label" in row:
+            node_counts[str(row["label"])] = int(row.get("count") or 0)
+        else:
+            total_nodes = int(row.get("count") or 0)
+    rel_counts: dict[str, int] = {}
+    total_rels = 0
+    for row in data.get("relationships") or []:
+        if "startLabel" in row or "endLabel" in row:
+            continue
+        if "relationshipType" in row:
+            rel_counts[str(row["relationshipType"])] = int(row.get("count") or 0)
+        else:
+            total_rels = int(row.get("count") or 0)
+    return {
+        "source": "graph_counts",
+        "node_counts": node_counts,
+        "relationship_counts": rel_counts,
+        "total_nodes": total_nodes,
+        "total_relationships": total_rels,
+        "indexes": [dict(x) for x in data.get("indexes") or []],
+        "constraints": [dict(x) for x in data.get("constraints") or []],
+    }
+
+
+def _inventory_from_count_queries(
+    session: Any, schema: tuple[list[Any], list[Any]] | None = None
+) -> dict[str, Any]:
+    # Fallback when db.stats.retrieve is not permitted: literal-label counts still hit the count
+    # store, and UNION ALL folds them into a single statement. `schema` carries the previous
+    # (indexes, constraints) listing forward when no DDL has run since it was read.
+    labels = [r["label"] for r in session.run("CALL db.labels() YIELD label RETURN label").data()]
+    rel_types = [
+        r["relationshipType"]
+        for r in session.run(
+            "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType"
+        ).data()
+    ]
+    parts = [
+        "MATCH (n) RETURN 'node' AS kind, null AS name, count(n) AS count",
+        "MATCH ()-[r]->() RETURN 'rel' AS kind, null AS name, count(r) AS count",
+    ]
+    parts += [
+        f"MATCH (n:{_cypher_name(x)}) RETURN 'node' AS kind, $labels[{i}] AS name, "
+        "count(n) AS count"
+        for i, x in enumerate(labels)
+    ]
+    parts += [
+        f"MATCH ()-[r:{_cypher_name(x)}]->() RETURN 'rel' AS kind, $rel_types[{i}] AS name, "
+        "count(r) AS count"
+        for i, x in enumerate(rel_types)
+    ]
+    node_counts: dict[str, int] = {}
+    rel_counts: dict[str, int] = {}
+    total_nodes = 0
+    total_rels = 0
+    for row in session.run("\nUNION ALL\n".join(parts), labels=labels, rel_types=rel_types).data():
+        if row["kind"] == "node":
+            if row["name"] is None:
+                total_nodes = int(row["count"])
+            else:
+                node_counts[str(row["name"])] = int(row["count"])
+        elif row["name"] is None:
+            total_rels = int(row["count"])
+        else:
+            rel_counts[str(row["name"])] = int(row["count"])
+
+    if schema is not None:
+        indexes, constraints = schema
+    else:
+        indexes, constraints = [], []
+        with contextlib.suppress(Exception):
+            indexes = session.run(
+                "SHOW INDEXES YIELD name, type, entityType, labelsOrTypes, properties, state"
+            ).data()
+        with contextlib.suppress(Exception):
+            constraints = session.run(
+                "SHOW CONSTRAINTS YIELD name, type, entityType, labelsOrTypes, properties"
+            ).data()
+    return {
+        "source": "count_queries",
+        "node_counts": node_counts,
+        "relationship_counts": rel_counts,
+        "total_nodes": total_nodes,
+        "total_relationships": total_rels,
+        "indexes": indexes,
+        "constraints": constraints,
+    }
+
+
+def _compute_neo4j_inventory(schema: tuple[list[Any], list[Any]] | None) -> dict[str, Any]:
+    driver = _neo4j_driver(repo_root)
+    with driver.session(default_access_mode=READ_ACCESS) as session:
+        try:
+            return _inventory_from_graph_counts(session)
+        except Exception:
+            return _inventory_from_count_queries(session, schema)
+
+
+def _refresh_neo4j_inventory(requested_at: float) -> dict[str, Any]:
+    """
+    Refresh the snapshot unless another refresh that started after `requested_at` already did.
+
+    Counts are always re-read (they come from the count store, so this is cheap); the
+    index/constraint listing is reused until neo4j_schema runs DDL.
+    """
+    with _NEO4J_INVENTORY_REFRESH_LOCK:
+        with _NEO4J_INVENTORY_LOCK:
+            previous = _NEO4J_INVENTORY["snapshot"]
+            if previous is not None and float(_NEO4J_INVENTORY["ts"]) >= requested_at:
+                return previous
+            _NEO4J_INVENTORY["refreshing"] = True
+            schema_dirty = bool(_NEO4J_INVENTORY["schema_dirty"])
+            _NEO4J_INVENTORY["schema_dirty"] = False
+            started = time.monotonic()
+        schema = None
+        if previous is not None and not schema_dirty:
+            schema = (previous["indexes"], previous["constraints"])
+        try:
+            snapshot = _compute_neo4j_inventory(schema)
+        except Exception:
+            with _NEO4J_INVENTORY_LOCK:
+                _NEO4J_INVENTORY["refreshing"] = False
+                _NEO4J_INVENTORY["schema_dirty"] |= schema_dirty
+            raise
+        with _NEO4J_INVENTORY_LOCK:
+            _NEO4J_INVENTORY["snapshot"] = snapshot
+            # Stamp with the start time so a read that began before a request never satisfies it.
+            _NEO4J_INVENTORY["ts"] = started
+            _NEO4J_INVENTORY["refreshing"] = False
+        return snapshot
+
+
+def _refresh_neo4j_inventory_in_background(requested_at: float) -> None:
+    try:
+        _refresh_neo4j_inventory(requested_at)
+    except Exception as exc:
+        logger.warning("Background neo4j_inventory refresh failed: %s", exc)
+
+
+def _invalidate_neo4j_inventory() -> None:
+    with _NEO4J_INVENTORY_LOCK:
+        _NEO4J_INVENTORY["ts"] = 0.0
+        _NEO4J_INVENTORY["schema_dirty"] = True
+
+
+def _neo4j_inventory_snapshot(*, force: bool = False) -> tuple[dict[str, Any], float, bool]:
+    """
+    Return (snapshot, age_s, refreshing).
+
+    Fresh snapshots are served as-is; moderately stale ones are served immediately while a
+    single background thread refreshes them; missing or very stale ones refresh inline.
+    """
+    ttl_s = _float_env("SIRVIST_NEO4J_INVENTORY_TTL_S", 300.0)
+    max_stale_s = _float_env("SIRVIST_NEO4J_INVENTORY_MAX_STALE_S", 3600.0)
+    now = time.monotonic()
+    with _NEO4J_INVENTORY_LOCK:
+        snapshot = _NEO4J_INVENTORY["snapshot"]
+        age = now - float(_NEO4J_INVENTORY["ts"])
+        if snapshot is not None and not force and age < ttl_s:
+            return snapshot, age, bool(_NEO4J_INVENTORY["refreshing"])
+        serve_stale = snapshot is not None and not force and age < max_stale_s
+        start_background = serve_stale and not _NEO4J_INVENTORY["refreshing"]
+        if start_background:
+            _NEO4J_INVENTORY["refreshing"] = True
+    if serve_stale:
+        if start_background:
+            threading.Thread(
+                target=_refresh_neo4j_inventory_in_background,
+                args=(now,),
+                name="neo4j-inventory-refresh",
+                daemon=True,
+            ).start()
+        return snapshot, age, True
+    snapshot = _refresh_neo4j_inventory(now)
+    with _NEO4J_INVENTORY_LOCK:
+        return snapshot, time.monotonic() - float(_NEO4J_INVENTORY["ts"]), False
+
+
+@mcp.tool(
+    name="neo4j_inventory",
+    description=(
+        "Return inventory from the Neo4j count store: per-label node counts, per-type "
+        "relationship counts, indexes and constraints. Served from a cached snapshot that is "
+        "refreshed in the background; pass refresh=true to force a fresh read."
+    ),
+)
+@_offloaded
+def neo4j_inventory(refresh: bool = False) -> dict[str, Any]:
+    snapshot, age, refreshing = _neo4j_inventory_snapshot(force=refresh)
+    labels = sorted(snapshot["node_counts"])
+    rels = sorted(snapshot["relationship_counts"])
+    return {
+        "labels_count": len(labels),
+        "rels_count": len(rels),
+        "labels_sample": labels[:200],
+        "rels_sample": rels[:200],
+        "node_counts": snapshot["node_counts"],
+        "relationship_counts": snapshot["relationship_counts"],
+        "total_nodes": snapshot["total_nodes"],
+        "total_relationships": snapshot["total_relationships"],
+        "indexes": snapshot["indexes"],
+        "constraints": snapshot["constraints"],
+        "snapshot": {
+            "source": snapshot["source"],
+            "age_s": round(age, 3),
+            "refreshing": refreshing,
+        },
+    }
+
+
+_VERTEX_SEARCH_POOL = ThreadPoolExecutor(
+    max_workers=max(1, _int_env("SIRVIST_VERTEX_SEARCH_CONCURRENCY", 8)),
+    thread_name_prefix="vertex-search",
+)
+
+
+def _patent_datastores() -> list[tuple[str, str]]:
+    """
+    Return configured (source_kind, datastore_id) pairs in merge order.
+
+    drafts/provisional come from their dedicated env vars; SIRVIST_VERTEX_PATENT_DATASTORES may
+    add more as a comma-separated list of kind=datastore_id.
+    """
+    pairs: list[tuple[str, str]] = [
+        ("drafts", _env("SIRVIST_VERTEX_PATENT_DRAFTS_DATASTORE_ID", "")),
+        ("provisional", _env("SIRVIST_VERTEX_PROVISIONAL_DATASTORE_ID", "")),
+    ]
+    for raw in _env("SIRVIST_VERTEX_PATENT_DATASTORES", "").split(","):
+        kind, _, ds_id = raw.partition("=")
+        kind = kind.strip().lower()
+        if kind and ds_id.strip() and kind not in {k for k, _ in pairs}:
+            pairs.append((kind, ds_id.strip()))
+    return pairs
+
+
+def _split_budget(max_results: int, kinds: list[str]) -> list[int]:
+    """
+    Split `max_results` evenly across `kinds`, handing leftover slots out in listed order.
+
+    As with the original two-datastore split, provisional is guaranteed a slot before the
+    others when there are fewer slots than sources (k=1 goes to provisional, not drafts).
+    """
+    base, extra = divmod(max_results, len(kinds))
+    order = list(range(len(kinds)))
+    if base == 0 and "provisional" in kinds:
+        first = kinds.index("provisional")
+        order.remove(first)
+        order.insert(0, first)
+    budget = [base] * len(kinds)
+    for i in order[:extra]:
+        budget[i] += 1
+    return budget
+
+
+def _interleave_results(
+    lists: list[list[dict[str, Any]]], max_results: int
+) -> list[dict[str, Any]]:
+    # Interleave results to preserve representation, with de-dupe by (uri, doc_id).
+    out: list[dict[str, Any]] = []
+    seen: set[tuple[str, str]] = set()
+    for i in range(max(len(x) for x in lists) if lists else 0):
+        for lst in lists:
+            if i >= len(lst):
+                continue
+            r = lst[i]
+            key = (str(r.get("uri") or ""), str(r.get("doc_id") or ""))
+            if key in seen:
+                continue
+            seen.add(key)
+            out.append(r)
+            if len(out) >= max_results:
+                return out
+    return out
+
+
+def _vertex_fan_out(
+    *, query: str, plan: list[tuple[str, str, int]], deadline_s: float
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Search every (source_kind, datastore_id, k) in `plan` concurrently under one shared deadline.
+
+    Returns (packets in plan order, errors). Datastores that fail or miss the deadline are
+    reported in `errors` instead of failing the whole query.
+    """
+    started = time.monotonic()
+    futures = [
+        _VERTEX_SEARCH_POOL.submit(
+            _vertex_ai_search, datastore_id=ds_id, query=query, k=k, timeout=deadline_s
+        )
+        for _, ds_id, k in plan
+    ]
+    wait_futures(futures, timeout=deadline_s)
+
+    packets: list[dict[str, Any]] = []
+    errors: list[dict[str, Any]] = []
+    for (kind, ds_id, k), fut in zip(plan, futures, strict=True):
+        if not fut.done():
+            fut.cancel()
+            errors.append(
+                {
+                    "source_kind": kind,
+                    "datastore_id": ds_id,
+                    "error": f"timed out after {round(time.monotonic() - started, 2)}s",
+                }
+            )
+            continue
+        exc = fut.exception()
+        if exc is not None:
+            errors.append({"source_kind": kind, "datastore_id": ds_id, "error": str(exc)})
+            continue
+        packets.append(
+            _build_evidence_packet(
+                query=query,
+                raw=fut.result(),
+                max_results=k,
+                source_kind=kind,
+                datastore_id=ds_id,
+            )
+        )
+    return packets, errors
+
+
+_PATENT_RAG_CACHE_TTL_S = _float_env("SIRVIST_PATENT_RAG_CACHE_TTL_S", 3600.0)
+_PATENT_RAG_CACHE_STALE_S = _float_env("SIRVIST_PATENT_RAG_CACHE_STALE_S", 86400.0)
+_PATENT_RAG_CACHE = _TieredCache(
+    memory_entries=_int_env("SIRVIST_PATENT_RAG_CACHE_MEMORY_ENTRIES", 256),
+    max_age_s=_PATENT_RAG_CACHE_TTL_S + _PATENT_RAG_CACHE_STALE_S,
+    disk=_SqliteCache(
+        Path(_env("SIRVIST_PATENT_RAG_CACHE_PATH", str(state_dir() / "patent_rag_cache.sqlite3"))),
+        max_bytes=_int_env("SIRVIST_PATENT_RAG_CACHE_MAX_BYTES", 50_000_000),
+        max_age_s=_PATENT_RAG_CACHE_TTL_S + _PATENT_RAG_CACHE_STALE_S,
+    ),
+)
+_PATENT_RAG_REFRESHING_LOCK = threading.Lock()
+_PATENT_RAG_REFRESHING: set[str] = set()
+
+
+def _patent_rag_scope(k: int, requested_sources: set[str], selected: list[tuple[str, str]]) -> str:
+    # Everything except the query text that changes what patent_rag.query returns.
+    return json.dumps(
+        {
+            "k": int(k),
+            "sources": sorted(requested_sources),
+            "datastores": sorted(ds_id for _, ds_id in selected),
+        },
+        sort_keys=True,
+    )
+
+
+def _patent_rag_cache_key(query: str, scope: str) -> str:
+    material = f"{scope}\n{' '.join(query.lower().split())}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _patent_rag_vertex(
+    query: str, max_results: int, selected: list[tuple[str, str]]
+) -> dict[str, Any]:
+    # Split budget across sources so each one is represented whenever k allows it; sources
+    # left with a zero share (k smaller than the number of sources) are not queried.
+    budget = _split_budget(max_results, [kind for kind, _ in selected])
+    plan = [
+        (kind, ds_id, k_i) for (kind, ds_id), k_i in zip(selected, budget, strict=True) if k_i > 0
+    ]
+    packets, errors = _vertex_fan_out(
+        query=query,
+        plan=plan,
+        deadline_s=_float_env("SIRVIST_VERTEX_SEARCH_DEADLINE_S", 30.0),
+    )
+    if errors and not packets:
+        raise RuntimeError(
+            "All Vertex datastore searches failed: "
+            + "; ".join(f"{e['source_kind']}: {e['error']}" for e in errors)
+        )
+
+    lists: list[list[dict[str, Any]]] = []
+    for pkt in packets:
+        rows = pkt.get("results") if isinstance(pkt, dict) else None
+        if isinstance(rows, list):
+            lists.append([r for r in rows if isinstance(r, dict)])
+
+    merged: dict[str, Any] = {
+        "query": query,
+        "source": "vertex_ai_search",
+        "results": _interleave_results(lists, max_results),
+        "sources": [{"source_kind": kind, "datastore_id": ds_id} for kind, ds_id in selected],
+        "partial": bool(errors),
+    }
+    if errors:
+        merged["errors"] = errors
+    return merged
+
+
+def _patent_rag_vertex_cached(
+    key: str, query: str, max_results: int, selected: list[tuple[str, str]]
+) -> dict[str, Any]:
+    packet = _patent_rag_vertex(query, max_results, selected)
+    # Partial packets (a datastore timed out) are served but never cached.
+    if not packet.get("partial"):
+        _PATENT_RAG_CACHE.put(key, packet)
+    return packet
+
+
+def _revalidate_patent_rag(
+    key: str, query: str, max_results: int, selected: list[tuple[str, str]]
+) -> None:
+    with _PATENT_RAG_REFRESHING_LOCK:
+        if key in _PATENT_RAG_REFRESHING:
+            return
+        _PATENT_RAG_REFRESHING.add(key)
+
+    def run() -> None:
+        try:
+            _patent_rag_vertex_cached(key, query, max_results, selected)
+        except Exception as exc:
+            logger.warning("patent_rag.query background revalidation failed: %s", exc)
+        finally:
+            with _PATENT_RAG_REFRESHING_LOCK:
+                _PATENT_RAG_REFRESHING.discard(key)
+
+    threading.Thread(target=run, name="patent-rag-revalidate", daemon=True).start()
+
+
+# fmt: off
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "which",
+    "with", "about", "into", "over", "under", "than", "then", "there", "these", "those", "their",
+})
+# fmt: on
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokenize(text: str) -> list[str]:
+    return [t for t in _WORD_RE.findall(text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def _chunk_text(text: str, max_chars: int) -> list[str]:
+    chunks: list[str] = []
+    buf = ""
+    for para in re.split(r"\n\s*\n", text):
+        para = para.strip()
+        if not para:
+            continue
+        if buf and len(buf) + len(para) + 2 > max_chars:
+            chunks.append(buf)
+            buf = ""
+        while len(para) > max_chars and not buf:
+            chunks.append(para[:max_chars])
+            para = para[max_chars:]
+        buf = f"{buf}\n\n{para}" if buf else para
+    if buf:
+        chunks.append(buf)
+    return chunks
+
+
+def _ollama_embed(texts: list[str]) -> np.ndarray:
+    """Embed `texts` with the repo-isolated Ollama service; rows are L2-normalized float32."""
+    host = _env("OLLAMA_HOST", "http://localhost:11436").rstrip("/")
+    model = _env("OLLAMA_EMBED_MODEL", "bge-m3:latest")
+    vectors: list[list[float]] = []
+    for start in range(0, len(texts), 32):
+        resp = _http_request(
+            "POST",
+            f"{host}/api/embed",
+            json_body={"model": model, "input": texts[start : start + 32]},
+            timeout=120,
+        )
+        if resp.status_code >= 400:
+            raise RuntimeError(f"Ollama embed HTTP {resp.status_code}: {resp.text}")
+        vectors.extend(resp.json().get("embeddings") or [])
+    if len(vectors) != len(texts):
+        raise RuntimeError("Ollama returned the wrong number of embeddings")
+    mat = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    return mat / np.where(norms == 0, 1.0, norms)
+
+
+class _LocalRagIndex:
+    """
+    On-disk hybrid index over a local patent corpus directory.
+
+    Layout under `index_dir`:
+      - manifest.json   per-file mtime/size and the row range of its chunks
+      - chunks.json     chunk text, title, source kind and term frequencies
+      - postings.json   BM25 inverted index (term -> [[row, tf], ...]) plus doc lengths
+      - vectors.npy     dense embeddings (rows x dim float32), opened memory-mapped
+
+    Re-indexing is incremental: unchanged files keep their chunks and vectors, so only new or
+    modified files are re-read and re-embedded. Rows that could not be embedded (Ollama down)
+    are recorded as `pending_rows` and retried on a later rescan. Files directly under the
+    corpus root get source_kind "local"; files in a subdirectory use that subdirectory's name.
+
+    Scans and rebuilds run on a background thread; searches use the last committed index.
+    """
+
+    VERSION = 1
+
+    def __init__(self, corpus_dir: Path, index_dir: Path) -> None:
+        self.corpus_dir = corpus_dir
+        self.index_dir = index_dir
+        self.suffixes = {
+            s.strip().lower()
+            for s in _env("SIRVIST_PATENT_RAG_LOCAL_SUFFIXES", ".md,.txt").split(",")
+            if s.strip()
+        }
+        self.chunk_chars = max(200, _int_env("SIRVIST_PATENT_RAG_LOCAL_CHUNK_CHARS", 1200))
+        self.rescan_s = _float_env("SIRVIST_PATENT_RAG_LOCAL_RESCAN_S", 30.0)
+        self.embed_retry_s = _float_env("SIRVIST_PATENT_RAG_LOCAL_EMBED_RETRY_S", 300.0)
+        self._lock = threading.Lock()
+        self._state: dict[str, Any] | None = None
+        self._loaded = False
+        self._building = False
+        self._scanned_at = float("-inf")
+        self._embed_retry_at = 0.0
+
+    def kinds(self) -> set[str]:
+        """source_kind values this corpus can produce: "local" plus each subdirectory name."""
+        kinds = {"local"}
+        with contextlib.suppress(OSError):
+            kinds.update(p.name.lower() for p in self.corpus_dir.iterdir() if p.is_dir())
+        return kinds
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        files: dict[str, tuple[int, int]] = {}
+        for path in self.corpus_dir.rglob("*"):
+            if path.suffix.lower() in self.suffixes and path.is_file():
+                st = path.stat()
+                files[path.relative_to(self.corpus_dir).as_posix()] = (st.st_mtime_ns, st.st_size)
+        return files
+
+    def _load(self) -> dict[str, Any] | None:
+        try:
+            manifest = json.loads((self.index_dir / "manifest.json").read_text(encoding="utf-8"))
+            if manifest.get("version") != self.VERSION or manifest.get("corpus_dir") != str(
+                self.corpus_dir
+            ):
+                return None
+            chunks = json.loads((self.index_dir / "chunks.json").read_text(encoding="utf-8"))
+            postings = json.loads((self.index_dir / "postings.json").read_text(encoding="utf-8"))
+            vectors = None
+            if manifest.get("dim"):
+                vectors = np.load(self.index_dir / "vectors.npy", mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        return {
+            "manifest": manifest,
+            "chunks": chunks,
+            "postings": postings,
+            "vectors": vectors,
+        }
+
+    def _write_json(self, name: str, data: Any) -> None:
+        tmp = self.index_dir / f"{name}.tmp"
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.index_dir / name)
+
+    def _rebuild(self, old: dict[str, Any] | None, files: dict[str, tuple[int, int]]) -> None:
+        embed_model = _env("OLLAMA_EMBED_MODEL", "bge-m3:latest")
+        old_manifest = (old or {}).get("manifest") or {}
+        old_files = old_manifest.get("files") or {}
+        old_chunks = (old or {}).get("chunks") or []
+        old_vectors = (old or {}).get("vectors")
+        old_pending = set(old_manifest.get("pending_rows") or [])
+        reuse_vectors = old_vectors is not None and old_manifest.get("embed_model") == embed_model
+
+        chunks: list[dict[str, Any]] = []
+        kept_rows: list[tuple[int, int]] = []  # (new_row, old_row) with reusable vectors
+        new_rows: list[int] = []
+        manifest_files: dict[str, Any] = {}
+        for rel in sorted(files):
+            mtime_ns, size = files[rel]
+            prev = old_files.get(rel)
+            start = len(chunks)
+            if prev and prev.get("mtime_ns") == mtime_ns and prev.get("size") == size:
+                for old_row in range(prev["rows"][0], prev["rows"][1]):
+                    if reuse_vectors and old_row not in old_pending:
+                        kept_rows.append((len(chunks), old_row))
+                    else:
+                        new_rows.append(len(chunks))
+                    chunks.append(old_chunks[old_row])
+            else:
+                text = (self.corpus_dir / rel).read_text(encoding="utf-8", errors="replace")
+                heading = re.search(r"^#+\s+(.+)$", text, flags=re.MULTILINE)
+                title = heading.group(1).strip() if heading else Path(rel).stem
+                kind = rel.split("/", 1)[0].lower() if "/" in rel else "local"
+                for i, chunk in enumerate(_chunk_text(text, self.chunk_chars)):
+                    terms = _tokenize(chunk)
+                    tf: dict[str, int] = {}
+                    for t in terms:
+                        tf[t] = tf.get(t, 0) + 1
+                    new_rows.append(len(chunks))
+                    chunks.append(
+                        {
+                            "doc_id": f"{rel}#{i}",
+                            "file": rel,
+                            "title": title,
+                            "source_kind": kind,
+                            "text": chunk,
+                            "len": len(terms),
+                            "tf": tf,
+                        }
+                    )
+            manifest_files[rel] = {"mtime_ns": mtime_ns, "size": size, "rows": [start, len(chunks)]}
+
+        postings: dict[str, list[list[int]]] = {}
+        for row, chunk in enumerate(chunks):
+            for term, count in chunk["tf"].items():
+                postings.setdefault(term, []).append([row, count])
+        lengths = [int(c["len"]) for c in chunks]
+
+        fresh: np.ndarray | None = None
+        pending: list[int] = []
+        if new_rows:
+            try:
+                fresh = _ollama_embed([chunks[r]["text"] for r in new_rows])
+            except Exception as exc:
+                # Ollama unavailable: serve BM25 for these rows and retry on a later rescan.
+                logger.warning("Local RAG embedding failed for %d chunks: %s", len(new_rows), exc)
+                pending = new_rows
+        vectors: np.ndarray | None = None
+        dim = 0
+        if fresh is not None:
+            dim = int(fresh.shape[1])
+        elif reuse_vectors and kept_rows:
+            dim = int(old_vectors.shape[1])
+        if dim:
+            vectors = np.zeros((len(chunks), dim), dtype=np.float32)
+            for new_row, old_row in kept_rows:
+                vectors[new_row] = old_vectors[old_row]
+            if fresh is not None:
+                vectors[new_rows] = fresh
+        elif chunks:
+            pending = list(range(len(chunks)))
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        if vectors is not None:
+            tmp = self.index_dir / "vectors.tmp.npy"
+            np.save(tmp, vectors)
+            os.replace(tmp, self.index_dir / "vectors.npy")
+        self._write_json("chunks.json", chunks)
+        self._write_json(
+            "postings.json",
+            {"postings": postings, "lengths": lengths},
+        )
+        # Manifest last: it is the commit point for the rest of the files.
+        self._write_json(
+            "manifest.json",
+            {
+                "version": self.VERSION,
+                "corpus_dir": str(self.corpus_dir),
+                "embed_model": embed_model if vectors is not None else None,
+                "dim": dim,
+                "pending_rows": pending,
+                "files": manifest_files,
+            },
+        )
+
+    def _refresh(self) -> None:
+        try:
+            with self._lock:
+                # Diff against the committed index on disk, or a restart would re-embed everything.
+                if not self._loaded:
+                    self._state = self._load()
+                    self._loaded = True
+                state = self._state
+            files = self._scan()
+            manifest = (state or {}).get("manifest") or {}
+            current = {
+                rel: (v["mtime_ns"], v["size"]) for rel, v in (manifest.get("files") or {}).items()
+            }
+            retry_embed = (
+                bool(manifest.get("pending_rows")) and time.monotonic() >= self._embed_retry_at
+            )
+            if state is None or current != files or retry_embed:
+                self._rebuild(state, files)
+                fresh = self._load()
+                if fresh is None:
+                    raise RuntimeError(f"Failed to build local RAG index in {self.index_dir}")
+                if fresh["manifest"].get("pending_rows"):
+                    self._embed_retry_at = time.monotonic() + self.embed_retry_s
+                with self._lock:
+                    self._state = fresh
+        except Exception as exc:
+            logger.warning("Local RAG index refresh failed: %s", exc)
+        finally:
+            with self._lock:
+                self._building = False
+
+    def refresh_in_background(self, *, force: bool = False) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._building or (not force and now - self._scanned_at < self.rescan_s):
+                return
+            self._building = True
+            self._scanned_at = now
+        threading.Thread(target=self._refresh, name="patent-rag-local-index", daemon=True).start()
+
+    def current(self) -> dict[str, Any] | None:
+        """Return the last committed index (None while the first build runs) and rescan if due."""
+        with self._lock:
+            if not self._loaded:
+                self._state = self._load()
+                self._loaded = True
+            state = self._state
+        self.refresh_in_background()
+        return state
+
+    @staticmethod
+    def search(
+        state: dict[str, Any], query: str, k: int, kinds: set[str] | None = None
+    ) -> tuple[list[dict[str, Any]], bool]:
+        """Return (top-k chunks by reciprocal-rank fusion of BM25 and dense ranks, dense_used)."""
+        chunks: list[dict[str, Any]] = state["chunks"]
+        if not chunks:
+            return [], False
+        allowed = None
+        if kinds is not None:
+            allowed = {row for row, c in enumerate(chunks) if c["source_kind"] in kinds}
+        depth = max(50, k * 5)
+
+        lengths = state["postings"]["lengths"]
+        n_docs = len(lengths)
+        avgdl = (sum(lengths) / n_docs) or 1.0
+        k1, b = 1.2, 0.75
+        bm25: dict[int, float] = {}
+        for term in set(_tokenize(query)):
+            plist = state["postings"]["postings"].get(term)
+            if not plist:
+                continue
+            idf = np.log(1.0 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            for row, tf in plist:
+                if allowed is not None and row not in allowed:
+                    continue
+                norm = tf + k1 * (1 - b + b * lengths[row] / avgdl)
+                bm25[row] = bm25.get(row, 0.0) + float(idf) * tf * (k1 + 1) / norm
+        bm25_ranked = sorted(bm25, key=bm25.__getitem__, reverse=True)[:depth]
+
+        dense_ranked: list[int] = []
+        vectors = state["vectors"]
+        if vectors is not None:
+            try:
+                sims = np.asarray(vectors @ _ollama_embed([query])[0])
+                if allowed is not None:
+                    mask = np.full(len(sims), -np.inf, dtype=np.float32)
+                    mask[list(allowed)] = 0.0
+                    sims = sims + mask
+                top = np.argpartition(-sims, min(depth, len(sims) - 1))[:depth]
+                dense_ranked = [int(r) for r in top[np.argsort(-sims[top])] if sims[r] > 0]
+            except Exception:
+                dense_ranked = []
+
+        # Reciprocal rank fusion is scale-free, so BM25 and cosine scores need no calibration.
+        dense_weight = _float_env("SIRVIST_PATENT_RAG_LOCAL_DENSE_WEIGHT", 1.0)
+        fused: dict[int, float] = {}
+        for rank, row in enumerate(bm25_ranked):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (60 + rank)
+        for rank, row in enumerate(dense_ranked):
+            fused[row] = fused.get(row, 0.0) + dense_weight / (60 + rank)
+        top_rows = sorted(fused, key=fused.__getitem__, reverse=True)[:k]
+        return [chunks[row] for row in top_rows], bool(dense_ranked)
+
+
+_LOCAL_RAG_LOCK = threading.Lock()
+_LOCAL_RAG: dict[str, Any] = {"index": None}
+
+
+def _local_rag_index() -> _LocalRagIndex | None:
+    corpus = _env("SIRVIST_PATENT_RAG_LOCAL_CORPUS_DIR", "")
+    if not corpus:
+        return None
+    corpus_dir = Path(corpus).expanduser().resolve()
+    index_dir = Path(
+        _env("SIRVIST_PATENT_RAG_LOCAL_INDEX_DIR", str(state_dir() / "patent_rag_local"))
+    )
+    with _LOCAL_RAG_LOCK:
+        index = _LOCAL_RAG["index"]
+        if index is None or index.corpus_dir != corpus_dir or index.index_dir != index_dir:
+            index = _LocalRagIndex(corpus_dir, index_dir)
+            _LOCAL_RAG["index"] = index
+        return index
+
+
+def _patent_rag_local(query: str, max_results: int, kinds: set[str] | None) -> dict[str, Any]:
+    index = _local_rag_index()
+    if index is None:
+        return {
+            "query": query,
+            "source": "local_hybrid_rag",
+            "error": "Local hybrid RAG corpus not configured. Set "
+            "SIRVIST_PATENT_RAG_LOCAL_CORPUS_DIR or use backend='vertex'.",
+            "results": [],
+        }
+    if not index.corpus_dir.is_dir():
+        raise ValueError(f"Local RAG corpus directory not found: {index.corpus_dir}")
+    state = index.current()
+    if state is None:
+        return {
+            "query": query,
+            "source": "local_hybrid_rag",
+            "error": "Local hybrid RAG index is still being built. Retry shortly.",
+            "indexing": True,
+            "results": [],
+        }
+    hits, dense_used = index.search(state, query, max_results, kinds)
+    # Reuse the Vertex packet builder so both backends share snippet cleanup and size caps.
+    raw = {
+        "results": [
+            {
+                "document": {
+                    "id": hit["doc_id"],
+                    "derivedStructData": {
+                        "link": (index.corpus_dir / hit["file"]).as_uri(),
+                        "title": hit["title"],
+                        "snippets": [{"snippet": hit["text"]}],
+                    },
+                }
+            }
+            for hit in hits
+        ]
+    }
+    packet = _build_evidence_packet(
+        query=query,
+        raw=raw,
+        max_results=max_results,
+        source_kind="local",
+        datastore_id=str(index.index_dir),
+    )
+    for row, hit in zip(packet["results"], hits, strict=False):
+        row["source_kind"] = hit["source_kind"]
+    packet["source"] = "local_hybrid_rag"
+    packet["retrieval"] = {"bm25": True, "dense": dense_used}
+    return packet
+
+
+def _stem(token: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(token) > len(suffix) + 3 and token.endswith(suffix):
+            return token[: -len(suffix)]
+    return token
+
+
+# Terms whose presence or absence changes what a query asks for, however similar the rest is.
+_NEGATION_TERMS = frozenset({"not", "no", "non", "without", "except", "excluding"})
+
+
+class _MinHashLsh:
+    """
+    Near-duplicate query index: MinHash signatures over normalized query terms, bucketed by
+    LSH bands so lookups only compare against plausible candidates.
+
+    Queries are normalized to an order-free set of lowercased, stopword-free, lightly stemmed
+    terms. Candidates sharing any band are re-scored by exact Jaccard similarity against the
+    configured threshold. Queries with fewer than `min_terms` terms never match, and a
+    candidate is rejected if the two queries differ in a negation or a term containing a digit
+    (claim numbers, dates). Entries are bounded and evicted oldest-first.
+    """
+
+    _PRIME = (1 << 61) - 1
+
+    def __init__(
+        self, *, threshold: float, bands: int, rows: int, max_entries: int, min_terms: int = 1
+    ) -> None:
+        self.threshold = float(threshold)
+        self.min_terms = max(1, int(min_terms))
+        self.bands = max(1, int(bands))
+        self.rows = max(1, int(rows))
+        self.max_entries = max(1, int(max_entries))
+        rng = random.Random(0x5EED)
+        self._perms = [
+            (rng.randrange(1, self._PRIME), rng.randrange(0, self._PRIME))
+            for _ in range(self.bands * self.rows)
+        ]
+        self._lock = threading.Lock()
+        # entry key -> (scope, terms, original query, band keys)
+        self._entries: OrderedDict[str, tuple[str, frozenset[str], str, list[Any]]] = OrderedDict()
+        self._buckets: dict[Any, set[str]] = {}
+
+    @staticmethod
+    def terms(query: str) -> frozenset[str]:
+        return frozenset(_stem(t) for t in _tokenize(query))
+
+    def _band_keys(self, scope: str, terms: frozenset[str]) -> list[Any]:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "big")
+            for t in terms
+        ]
+        sig = [min((a * h + b) % self._PRIME for h in hashes) for a, b in self._perms]
+        return [
+            (scope, band, tuple(sig[band * self.rows : (band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+    def add(self, query: str, scope: str, key: str) -> None:
+        if self.threshold <= 0:
+            return
+        terms = self.terms(query)
+        if len(terms) < self.min_terms:
+            return
+        band_keys = self._band_keys(scope, terms)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = (scope, terms, query, band_keys)
+            for bk in band_keys:
+                self._buckets.setdefault(bk, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, (_, _, _, old_bands) = self._entries.popitem(last=False)
+                for bk in old_bands:
+                    bucket = self._buckets.get(bk)
+                    if bucket is not None:
+                        bucket.discard(old_key)
+                        if not bucket:
+                            del self._buckets[bk]
+
+    def lookup(self, query: str, scope: str) -> list[tuple[str, str, float]]:
+        """Return [(original query, entry key, jaccard)] at or above threshold, best first."""
+        if self.threshold <= 0:
+            return []
+        terms = self.terms(query)
+        if len(terms) < self.min_terms:
+            return []
+        band_keys = self._band_keys(scope, terms)
+        with self._lock:
+            candidates = set().union(*(self._buckets.get(bk, set()) for bk in band_keys))
+            scored = []
+            for key in candidates:
+                _, other, original, _ = self._entries[key]
+                if any(t in _NEGATION_TERMS or any(c.isdigit() for c in t) for t in terms ^ other):
+                    continue
+                similarity = len(terms & other) / len(terms | other)
+                if similarity >= self.threshold:
+                    scored.append((original, key, similarity))
+        return sorted(scored, key=lambda x: x[2], reverse=True)
+
+
+_PATENT_RAG_SIMILAR = _MinHashLsh(
+    threshold=_float_env("SIRVIST_PATENT_RAG_SIMILAR_THRESHOLD", 0.9),
+    bands=16,
+    rows=2,
+    max_entries=_int_env("SIRVIST_PATENT_RAG_SIMILAR_MAX_ENTRIES", 5000),
+    min_terms=_int_env("SIRVIST_PATENT_RAG_SIMILAR_MIN_TERMS", 3),
+)
 
 
 @mcp.tool(
     name="patent_rag.query",
     description=(
         "Query the patent corpus and return a bounded EvidencePacket JSON. "
-        "Backends: vertex (Vertex AI Search) or local (Sirvist hybrid RAG)."
+        "Backends: vertex (Vertex AI Search) or local (Sirvist hybrid RAG). "
+        "Vertex packets are cached (cache: hit/miss/stale/similar, where similar reports the "
+        "matched_query); pass use_cache=false to bypass."
     ),
 )
+@_offloaded
 def patent_rag_query(
     query: str,
     k: int = 5,
     backend: str = "vertex",
     sources: str | None = None,
+    use_cache: bool = True,
 ) -> dict[str, Any]:
     backend_n = (backend or "vertex").strip().lower()
     q = (query or "").strip()
     if not q:
         raise ValueError("query is required")
 
-    requested_sources = {"drafts", "provisional"}
-    if sources is not None:
-        parsed = [s.strip().lower() for s in str(sources).split(",") if s.strip()]
-        requested_sources = set(parsed)
-        unknown = requested_sources.difference({"drafts", "provisional"})
-        if unknown:
-            raise ValueError("sources must be a comma-separated list of: drafts, provisional")
-        if not requested_sources:
-            raise ValueError("sources must include at least one of: drafts, provisional")
+    if backend_n not in {"vertex", "local"}:
+        raise ValueError("backend must be 'vertex' or 'local'")
 
-    max_results = max(1, min(20, int(k)))
-    if backend_n == "vertex":
-        drafts_ds = _env("SIRVIST_VERTEX_PATENT_DRAFTS_DATASTORE_ID", "")
-        provisional_ds = _env("SIRVIST_VERTEX_PROVISIONAL_DATASTORE_ID", "")
-        if not drafts_ds and not provisional_ds:
-            raise ValueError(
-                "Missing Vertex datastore ids. Set "
-                "SIRVIST_VERTEX_PATENT_DRAFTS_DATASTORE_ID and/or "
-                "SIRVIST_VERTEX_PROVISIONAL_DATASTORE_ID."
-                "SIRVIST_VERTEX_PROVISIONAL_DATASTORE_ID."
-            )
-        if "drafts" not in requested_sources:
-            drafts_ds = ""
-        if "provisional" not in requested_sources:
-            provisional_ds = ""
-        if not drafts_ds and not provisional_ds:
+    def requested(known_sources: list[str]) -> set[str]:
+        # Each backend has its own source kinds: Vertex datastores or local corpus subdirectories.
+        if sources is None:
+            return set(known_sources)
+        parsed = {s.strip().lower() for s in str(sources).split(",") if s.strip()}
+        if parsed.difference(known_sources):
             raise ValueError(
-                "Requested sources are not configured. Set Vertex datastore ids "
-                "for the requested sources."
+                f"sources must be a comma-separated list of: {', '.join(known_sources)}"
             )
+        if not parsed:
+            raise ValueError(f"sources must include at least one of: {', '.join(known_sources)}")
+        return parsed
 
-        # Split budget across sources so we always return evidence from BOTH
-        # when both are configured.
-        k_provisional = 0
-        k_drafts = 0
-        if drafts_ds and provisional_ds:
-            k_provisional = max(1, max_results // 2)
-            k_drafts = max_results - k_provisional
-        elif drafts_ds:
-            k_drafts = max_results
-        else:
-            k_provisional = max_results
-
-        packets: list[dict[str, Any]] = []
-        if drafts_ds and k_drafts > 0:
-            raw = _vertex_ai_search(datastore_id=drafts_ds, query=q, k=k_drafts)
-            packets.append(
-                _build_evidence_packet(
-                    query=q,
-                    raw=raw,
-                    max_results=k_drafts,
-                    source_kind="drafts",
-                    datastore_id=drafts_ds,
-                )
-            )
-        if provisional_ds and k_provisional > 0:
-            raw = _vertex_ai_search(datastore_id=provisional_ds, query=q, k=k_provisional)
-            packets.append(
-                _build_evidence_packet(
-                    query=q,
-                    raw=raw,
-                    max_results=k_provisional,
-                    source_kind="provisional",
-                    datastore_id=provisional_ds,
-                )
-            )
+    max_results = max(1, min(20, int(k)))
+    if backend_n == "local":
+        index = _local_rag_index()
+        kinds = (
+            requested(sorted(index.kinds())) if index is not None and sources is not None else None
+        )
+        return _patent_rag_local(q, max_results, kinds)
 
-        merged: dict[str, Any] = {
-            "query": q,
-            "source": "vertex_ai_search",
-            "results": [],
-            "sources": [
-                {"source_kind": "drafts", "datastore_id": drafts_ds} if drafts_ds else None,
-                {"source_kind": "provisional", "datastore_id": provisional_ds}
-                if provisional_ds
-                else None,
-            ],
-        }
-        merged["sources"] = [x for x in merged["sources"] if x]
-
-        # Interleave results to preserve representation, with de-dupe by (uri, doc_id).
-        lists: list[list[dict[str, Any]]] = []
-        for pkt in packets:
-            rows = pkt.get("results") if isinstance(pkt, dict) else None
-            if isinstance(rows, list):
-                lists.append([r for r in rows if isinstance(r, dict)])
-
-        seen: set[tuple[str, str]] = set()
-        for i in range(max(len(x) for x in lists) if lists else 0):
-            for lst in lists:
-                if i >= len(lst):
-                    continue
-                r = lst[i]
-                key = (str(r.get("uri") or ""), str(r.get("doc_id") or ""))
-                if key in seen:
-                    continue
-                seen.add(key)
-                merged["results"].append(r)
-                if len(merged["results"]) >= max_results:
-                    break
-            if len(merged["results"]) >= max_results:
-                break
+    datastores = _patent_datastores()
+    requested_sources = requested([kind for kind, _ in datastores])
+    if not any(ds_id for _, ds_id in datastores):
+        raise ValueError(
+            "Missing Vertex datastore ids. Set "
+            "SIRVIST_VERTEX_PATENT_DRAFTS_DATASTORE_ID and/or "
+            "SIRVIST_VERTEX_PROVISIONAL_DATASTORE_ID."
+        )
+    selected = [(kind, ds_id) for kind, ds_id in datastores if ds_id and kind in requested_sources]
+    if not selected:
+        raise ValueError(
+            "Requested sources are not configured. Set Vertex datastore ids "
+            "for the requested sources."
+        )
 
-        return merged
+    if not use_cache:
+        return {**_patent_rag_vertex(q, max_results, selected), "cache": "bypass"}
+
+    scope = _patent_rag_scope(max_results, requested_sources, selected)
+    key = _patent_rag_cache_key(q, scope)
+    hit = _PATENT_RAG_CACHE.get(key)
+    if hit is not None:
+        packet, age = hit
+        _PATENT_RAG_SIMILAR.add(q, scope, key)
+        if age < _PATENT_RAG_CACHE_TTL_S:
+            return {**packet, "cache": "hit", "cache_age_s": round(age, 1)}
+        # Stale-while-revalidate: answer now, refresh in the background.
+        _revalidate_patent_rag(key, q, max_results, selected)
+        return {**packet, "cache": "stale", "cache_age_s": round(age, 1)}
+
+    for matched_query, matched_key, similarity in _PATENT_RAG_SIMILAR.lookup(q, scope):
+        near = _PATENT_RAG_CACHE.get(matched_key)
+        if near is not None and near[1] < _PATENT_RAG_CACHE_TTL_S:
+            return {
+                **near[0],
+                "cache": "similar",
+                "cache_age_s": round(near[1], 1),
+                "matched_query": matched_query,
+                "similarity": round(similarity, 3),
+            }
+
+    packet = _patent_rag_vertex_cached(key, q, max_results, selected)
+    if not packet.get("partial"):
+        _PATENT_RAG_SIMILAR.add(q, scope, key)
+    return {**packet, "cache": "miss"}
 
-    if backend_n == "local":
-        return {
-            "query": q,
-            "source": "local_hybrid_rag",
-            "error": "Local hybrid RAG adapter not wired in MCP yet. Use backend='vertex' for now.",
-            "results": [],
-        }
 
-    raise ValueError("backend must be 'vertex' or 'local'")
+_BIFROST_CACHE = _SqliteCache(
+    Path(_env("SIRVIST_BIFROST_CACHE_PATH", str(state_dir() / "bifrost_cache.sqlite3"))),
+    max_bytes=_int_env("SIRVIST_BIFROST_CACHE_MAX_BYTES", 100_000_000),
+    max_age_s=_float_env("SIRVIST_BIFROST_CACHE_TTL_S", 7 * 86400.0),
+)
+
+
+def _bifrost_cache_key(
+    model: str, messages: list[dict[str, Any]], max_tokens: int, temperature: float
+) -> str:
+    # Canonical JSON so key order inside messages does not split otherwise identical requests.
+    material = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "max_tokens": int(max_tokens),
+            "temperature": float(temperature),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
 
 
 @mcp.tool(
     name="bifrost.chat",
     description=(
         "Call Bifrost /v1/chat/completions with allowlisted models and strict caps. "
-        "Returns the full JSON response plus a best-effort assistant_text field."
+        "Returns the full JSON response plus a best-effort assistant_text field. "
+        "use_cache=true serves repeated temperature-0 requests from a persistent response cache."
     ),
 )
+@_offloaded
 def bifrost_chat(
     messages_json: str,
     model: str | None = None,
     max_tokens: int = 800,
     temperature: float = 0.2,
+    use_cache: bool = False,
 ) -> dict[str, Any]:
     try:
         messages = json.loads(messages_json)
@@ -631,18 +3782,183 @@ def bifrost_chat(
         raise ValueError("messages_json must decode to a JSON list of messages")
 
     chosen_model = (model or "").strip() or _env("BIFROST_MODEL", "openai/gpt-5.2-2025-12-11")
+    chat_messages = [m for m in messages if isinstance(m, dict)]
+    capped_tokens = max(1, min(4000, int(max_tokens)))
+    key = _bifrost_cache_key(chosen_model, chat_messages, capped_tokens, temperature)
+    if not use_cache:
+        cache_status = "bypass"
+    elif float(temperature) != 0 and not _bool_env("SIRVIST_BIFROST_CACHE_ANY_TEMPERATURE", False):
+        # Sampled completions are meant to differ between calls; replaying one would hide that.
+        cache_status = "nondeterministic"
+    else:
+        _enforce_bifrost_model_allowlist(chosen_model)
+        hit = _BIFROST_CACHE.get(key)
+        if hit is not None:
+            resp, age = hit
+            return {
+                "model": chosen_model,
+                "assistant_text": _assistant_text(resp),
+                "response": resp,
+                "cache": "hit",
+                "cache_age_s": round(age, 1),
+            }
+        cache_status = "miss"
+
     resp = _bifrost_chat_completions(
+        model=chosen_model,
+        messages=chat_messages,
+        max_tokens=capped_tokens,
+        temperature=float(temperature),
+    )
+    if cache_status == "miss" and resp.get("choices"):
+        _BIFROST_CACHE.put(key, resp)
+    return {
+        "model": chosen_model,
+        "assistant_text": _assistant_text(resp),
+        "response": resp,
+        "cache": cache_status,
+    }
+
+
+@mcp.tool(
+    name="bifrost.chat_batch",
+    description=(
+        "Run up to 50 Bifrost chat completions concurrently. items_json is a JSON list whose "
+        "entries are either a messages list or {messages, model?, max_tokens?, temperature?}; "
+        "the tool arguments are the defaults. Results keep input order and each item succeeds "
+        "or fails independently."
+    ),
+)
+@_offloaded
+def bifrost_chat_batch(
+    items_json: str,
+    model: str | None = None,
+    max_tokens: int = 800,
+    temperature: float = 0.2,
+) -> dict[str, Any]:
+    try:
+        items = json.loads(items_json)
+    except Exception as e:
+        raise ValueError(f"items_json must be valid JSON: {e}") from e
+    if not isinstance(items, list) or not items:
+        raise ValueError("items_json must decode to a non-empty JSON list")
+    if len(items) > 50:
+        raise ValueError("items_json may contain at most 50 items")
+
+    defaults = {
+        "model": (model or "").strip() or _env("BIFROST_MODEL", "openai/gpt-5.2-2025-12-11"),
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+    started = time.perf_counter()
+    futures = [
+        _BIFROST_BATCH_POOL.submit(_run_bifrost_batch_item, index, item, defaults)
+        for index, item in enumerate(items)
+    ]
+    results = [fut.result() for fut in futures]
+
+    ok_count = sum(1 for r in results if r["ok"])
+    return {
+        "results": results,
+        "ok_count": ok_count,
+        "error_count": len(results) - ok_count,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+@mcp.tool(
+    name="bifrost.chat_stream",
+    description=(
+        "Streaming variant of bifrost.chat: requests stream=true from Bifrost, forwards the text "
+        "to the client as progress notifications while it arrives, and returns the assembled "
+        "assistant_text with ttft_ms (time to first token) and tokens_per_s."
+    ),
+)
+async def bifrost_chat_stream(
+    messages_json: str,
+    ctx: Context,
+    model: str | None = None,
+    max_tokens: int = 800,
+    temperature: float = 0.2,
+) -> dict[str, Any]:
+    try:
+        messages = json.loads(messages_json)
+    except Exception as e:
+        raise ValueError(f"messages_json must be valid JSON: {e}") from e
+    if not isinstance(messages, list):
+        raise ValueError("messages_json must decode to a JSON list of messages")
+
+    chosen_model = (model or "").strip() or _env("BIFROST_MODEL", "openai/gpt-5.2-2025-12-11")
+    capped_tokens = max(1, min(4000, int(max_tokens)))
+    # Coalesce fragments so a fast model does not turn into one notification per token.
+    relay = _ProgressRelay(
+        ctx,
+        total=capped_tokens,
+        interval_s=_float_env("SIRVIST_BIFROST_PROGRESS_INTERVAL_S", 0.25),
+    )
+    result = await _run_in_tool_pool(
+        _bifrost_chat_stream,
         model=chosen_model,
         messages=[m for m in messages if isinstance(m, dict)],
-        max_tokens=max(1, min(4000, int(max_tokens))),
+        max_tokens=capped_tokens,
         temperature=float(temperature),
+        on_delta=lambda text, chunks: relay.emit(chunks, text),
+    )
+    await relay.aclose()
+    return {"model": chosen_model, **result}
+
+
+_ASSISTANT_IDS = _LruTtlCache(
+    ttl_s=_float_env("SIRVIST_LANGGRAPH_ASSISTANT_TTL_S", 600.0), max_entries=256
+)
+
+
+def _lookup_assistant_id(base: str, graph_id: str) -> str:
+    found = _http_json("POST", f"{base}/assistants/search", {"graph_id": graph_id, "limit": 100})
+    assistants = [a for a in (found if isinstance(found, list) else []) if isinstance(a, dict)]
+    assistants = [a for a in assistants if a.get("assistant_id")]
+    if not assistants:
+        raise ValueError(f"No LangGraph assistant found for graph_id '{graph_id}'.")
+    # The server creates one default assistant per graph; prefer it over user-made variants.
+    chosen = next(
+        (a for a in assistants if (a.get("metadata") or {}).get("created_by") == "system"),
+        assistants[0],
     )
-    assistant_text = ""
+    return str(chosen["assistant_id"])
+
+
+def _with_assistant(assistant_id: str | None, graph_id: str | None, call: Any) -> Any:
+    """
+    Run `call(assistant_id)`, resolving `graph_id` through `_ASSISTANT_IDS` when no id is given.
+
+    A 404 drops the cached mapping (the assistant may have been deleted or recreated); if the id
+    came from the cache, the call is retried once with a fresh lookup.
+    """
+    if assistant_id and graph_id:
+        raise ValueError("Pass either assistant_id or graph_id, not both.")
+    if assistant_id:
+        return call(str(assistant_id))
+    if not graph_id:
+        raise ValueError("assistant_id or graph_id is required")
+    base = _langgraph_base_url()
+    key = (base, str(graph_id))
+    cached = _ASSISTANT_IDS.get(key)
+    resolved = cached
+    if resolved is None:
+        # Only a fresh lookup (re)starts the TTL, so a mapping is re-checked at least every TTL.
+        resolved = _lookup_assistant_id(base, str(graph_id))
+        _ASSISTANT_IDS.put(key, resolved)
     try:
-        assistant_text = resp["choices"][0]["message"]["content"]
-    except Exception:
-        assistant_text = ""
-    return {"model": chosen_model, "assistant_text": assistant_text, "response": resp}
+        return call(resolved)
+    except RuntimeError as e:
+        if not str(e).startswith("HTTP 404"):
+            raise
+        _ASSISTANT_IDS.pop(key)
+        if cached is None:
+            raise
+    resolved = _lookup_assistant_id(base, str(graph_id))
+    _ASSISTANT_IDS.put(key, resolved)
+    return call(resolved)
 
 
 @mcp.tool(
@@ -652,6 +3968,7 @@ def bifrost_chat(
         "(e.g., find assistant_id UUID for graph_id/name)."
     ),
 )
+@_offloaded
 def langgraph_assistants_search(
     graph_id: str | None = None,
     name: str | None = None,
@@ -674,6 +3991,7 @@ def langgraph_assistants_search(
     name="langgraph.threads.create",
     description="Create a thread in the local LangGraph API (stateful runs).",
 )
+@_offloaded
 def langgraph_threads_create(
     thread_id: str | None = None, metadata_json: str | None = None
 ) -> dict[str, Any]:
@@ -691,101 +4009,241 @@ def langgraph_threads_create(
 
 @mcp.tool(
     name="langgraph.runs.create",
-    description="Create a stateless run in the local LangGraph API (POST /runs).",
+    description=(
+        "Create a stateless run in the local LangGraph API (POST /runs). "
+        "Pass assistant_id, or graph_id to use that graph's assistant (lookup is cached)."
+    ),
 )
+@_offloaded
 def langgraph_runs_create(
-    assistant_id: str,
     input_json: str,
+    assistant_id: str | None = None,
     config_json: str | None = None,
+    *,
+    graph_id: str | None = None,
 ) -> dict[str, Any]:
     base = _langgraph_base_url()
-    payload: dict[str, Any] = {"assistant_id": str(assistant_id)}
-    inp = json.loads(input_json)
-    payload["input"] = inp
-    if config_json:
-        cfg = json.loads(config_json)
-        if not isinstance(cfg, dict):
-            raise ValueError("config_json must decode to a JSON object")
-        payload["config"] = cfg
-    return _as_dict(_http_json("POST", f"{base}/runs", payload))
+    payload = _langgraph_run_payload(input_json, config_json)
+    return _as_dict(
+        _with_assistant(
+            assistant_id,
+            graph_id,
+            lambda aid: _http_json("POST", f"{base}/runs", {**payload, "assistant_id": aid}),
+        )
+    )
 
 
 @mcp.tool(
     name="langgraph.runs.wait",
-    description="Create a stateless run and wait for final output (POST /runs/wait).",
+    description=(
+        "Create a stateless run and wait for final output (POST /runs/wait). "
+        "Pass assistant_id, or graph_id to use that graph's assistant (lookup is cached)."
+    ),
 )
+@_offloaded
 def langgraph_runs_wait(
-    assistant_id: str,
     input_json: str,
+    assistant_id: str | None = None,
     config_json: str | None = None,
+    *,
+    graph_id: str | None = None,
 ) -> dict[str, Any]:
     base = _langgraph_base_url()
-    payload: dict[str, Any] = {"assistant_id": str(assistant_id), "input": json.loads(input_json)}
-    if config_json:
-        cfg = json.loads(config_json)
-        if not isinstance(cfg, dict):
-            raise ValueError("config_json must decode to a JSON object")
-        payload["config"] = cfg
-    return _as_dict(_http_json("POST", f"{base}/runs/wait", payload))
+    payload = _langgraph_run_payload(input_json, config_json)
+    return _as_dict(
+        _with_assistant(
+            assistant_id,
+            graph_id,
+            lambda aid: _http_json("POST", f"{base}/runs/wait", {**payload, "assistant_id": aid}),
+        )
+    )
+
+
+@mcp.tool(
+    name="langgraph.runs.stream",
+    description=(
+        "Create a stateless run and stream it (POST /runs/stream). Events are forwarded as "
+        "progress notifications; returns the final state (last 'values' event), the last payload "
+        "per stream mode and event counts. stream_mode is comma-separated (e.g. values,updates). "
+        "status is 'deadline' if deadline_s passed before the run ended. Pass assistant_id, or "
+        "graph_id to use that graph's assistant (lookup is cached)."
+    ),
+)
+async def langgraph_runs_stream(
+    input_json: str,
+    assistant_id: str | None = None,
+    ctx: Context | None = None,
+    config_json: str | None = None,
+    stream_mode: str = "values",
+    deadline_s: float = 300.0,
+    *,
+    graph_id: str | None = None,
+) -> dict[str, Any]:
+    return await _langgraph_stream_tool(
+        ctx,
+        "/runs/stream",
+        _langgraph_run_payload(input_json, config_json),
+        assistant_id=assistant_id,
+        graph_id=graph_id,
+        stream_mode=stream_mode,
+        deadline_s=deadline_s,
+    )
 
 
 @mcp.tool(
     name="langgraph.thread_runs.create",
     description=(
-        "Create a stateful run in the local LangGraph API (POST /threads/{thread_id}/runs)."
+        "Create a stateful run in the local LangGraph API (POST /threads/{thread_id}/runs). "
+        "Pass assistant_id, or graph_id to use that graph's assistant (lookup is cached)."
     ),
 )
+@_offloaded
 def langgraph_thread_runs_create(
     thread_id: str,
-    assistant_id: str,
     input_json: str,
+    assistant_id: str | None = None,
     config_json: str | None = None,
+    *,
+    graph_id: str | None = None,
 ) -> dict[str, Any]:
     base = _langgraph_base_url()
-    payload: dict[str, Any] = {"assistant_id": str(assistant_id), "input": json.loads(input_json)}
-    if config_json:
-        cfg = json.loads(config_json)
-        if not isinstance(cfg, dict):
-            raise ValueError("config_json must decode to a JSON object")
-        payload["config"] = cfg
-    return _as_dict(_http_json("POST", f"{base}/threads/{thread_id}/runs", payload))
+    url = f"{base}/threads/{thread_id}/runs"
+    payload = _langgraph_run_payload(input_json, config_json)
+    return _as_dict(
+        _with_assistant(
+            assistant_id,
+            graph_id,
+            lambda aid: _http_json("POST", url, {**payload, "assistant_id": aid}),
+        )
+    )
 
 
 @mcp.tool(
     name="langgraph.thread_runs.wait",
     description=(
-        "Create a stateful run and wait for final output (POST /threads/{thread_id}/runs/wait)."
+        "Create a stateful run and wait for final output (POST /threads/{thread_id}/runs/wait). "
+        "Pass assistant_id, or graph_id to use that graph's assistant (lookup is cached)."
     ),
 )
+@_offloaded
 def langgraph_thread_runs_wait(
     thread_id: str,
-    assistant_id: str,
     input_json: str,
+    assistant_id: str | None = None,
     config_json: str | None = None,
+    *,
+    graph_id: str | None = None,
 ) -> dict[str, Any]:
     base = _langgraph_base_url()
-    payload: dict[str, Any] = {"assistant_id": str(assistant_id), "input": json.loads(input_json)}
-    if config_json:
-        cfg = json.loads(config_json)
-        if not isinstance(cfg, dict):
-            raise ValueError("config_json must decode to a JSON object")
-        payload["config"] = cfg
-    return _as_dict(_http_json("POST", f"{base}/threads/{thread_id}/runs/wait", payload))
+    url = f"{base}/threads/{thread_id}/runs/wait"
+    payload = _langgraph_run_payload(input_json, config_json)
+    return _as_dict(
+        _with_assistant(
+            assistant_id,
+            graph_id,
+            lambda aid: _http_json("POST", url, {**payload, "assistant_id": aid}),
+        )
+    )
+
+
+@mcp.tool(
+    name="langgraph.thread_runs.stream",
+    description=(
+        "Create a stateful run and stream it (POST /threads/{thread_id}/runs/stream). Same "
+        "output as langgraph.runs.stream; if the deadline hits, the run keeps going server-side "
+        "and can be checked with langgraph.thread_runs.get using the returned run_id. Accepts "
+        "assistant_id or graph_id."
+    ),
+)
+async def langgraph_thread_runs_stream(
+    thread_id: str,
+    input_json: str,
+    assistant_id: str | None = None,
+    ctx: Context | None = None,
+    config_json: str | None = None,
+    stream_mode: str = "values",
+    deadline_s: float = 300.0,
+    *,
+    graph_id: str | None = None,
+) -> dict[str, Any]:
+    payload = _langgraph_run_payload(input_json, config_json)
+    payload["on_disconnect"] = "continue"
+    result = await _langgraph_stream_tool(
+        ctx,
+        f"/threads/{thread_id}/runs/stream",
+        payload,
+        assistant_id=assistant_id,
+        graph_id=graph_id,
+        stream_mode=stream_mode,
+        deadline_s=deadline_s,
+    )
+    return {"thread_id": thread_id, **result}
 
 
 @mcp.tool(
     name="langgraph.thread_runs.get",
     description="Get run status/result in a thread (GET /threads/{thread_id}/runs/{run_id}).",
 )
+@_offloaded
 def langgraph_thread_runs_get(thread_id: str, run_id: str) -> dict[str, Any]:
     base = _langgraph_base_url()
     return _as_dict(_http_json("GET", f"{base}/threads/{thread_id}/runs/{run_id}", None))
 
 
+@mcp.tool(
+    name="langgraph.runs.join",
+    description=(
+        "Wait on many thread runs at once. runs_json is a JSON list of {thread_id, run_id} (or "
+        "[thread_id, run_id] pairs). Polls all of them concurrently with adaptive backoff and "
+        "returns when all (or the first first_n) reach a terminal status or deadline_s passes, "
+        "with per-run status, polls and duration. Runs that 404 or keep failing are reported "
+        "as missing/failed and never count toward first_n."
+    ),
+)
+@_offloaded
+def langgraph_runs_join(
+    runs_json: str, first_n: int | None = None, deadline_s: float = 120.0
+) -> dict[str, Any]:
+    try:
+        runs = json.loads(runs_json)
+    except Exception as e:
+        raise ValueError(f"runs_json must be valid JSON: {e}") from e
+    if not isinstance(runs, list) or not runs:
+        raise ValueError("runs_json must decode to a non-empty JSON list")
+    if len(runs) > 100:
+        raise ValueError("runs_json may contain at most 100 runs")
+    pairs: list[tuple[str, str]] = []
+    for item in runs:
+        if isinstance(item, dict):
+            item = [item.get("thread_id"), item.get("run_id")]
+        if not isinstance(item, list) or len(item) != 2 or not all(item):
+            raise ValueError("each run must be {thread_id, run_id} or [thread_id, run_id]")
+        pairs.append((str(item[0]), str(item[1])))
+    target = len(pairs) if not first_n else max(1, min(len(pairs), int(first_n)))
+
+    started = time.perf_counter()
+    results = _langgraph_join(
+        pairs, target=target, deadline_s=max(0.0, min(3600.0, float(deadline_s)))
+    )
+    done_count = sum(1 for r in results if r["done"])
+    missing_count = sum(1 for r in results if r["missing"])
+    failed_count = sum(1 for r in results if r["gave_up"]) - missing_count
+    return {
+        "results": results,
+        "done_count": done_count,
+        "missing_count": missing_count,
+        "failed_count": failed_count,
+        "pending_count": len(results) - done_count - missing_count - failed_count,
+        "complete": done_count >= target,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
 @mcp.tool(
     name="langgraph.thread_runs.list",
     description="List runs in a thread (GET /threads/{thread_id}/runs).",
 )
+@_offloaded
 def langgraph_thread_runs_list(
     thread_id: str,
     *,
@@ -799,6 +4257,156 @@ def langgraph_thread_runs_list(
     return _as_dict(_http_json("GET", url, None), list_key="runs")
 
 
+_RUN_TABLE_COLUMNS = ["run_id", "status", "assistant_id", "created_at", "updated_at", "duration_s"]
+
+
+@mcp.tool(
+    name="langgraph.thread_runs.scan",
+    description=(
+        "List all runs in a thread, walking pages server-side up to max_runs (newest first). "
+        "Filters: status (comma-separated), since/until (ISO-8601, on created_at). "
+        "details=true re-fetches each run concurrently (bounded by detail_concurrency) for fresh "
+        "status and returns the full run objects too. Returns a compact columns/rows table and "
+        "per-status counts."
+    ),
+)
+@_offloaded
+def langgraph_thread_runs_scan(
+    thread_id: str,
+    max_runs: int = 500,
+    status: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    details: bool = False,
+    detail_concurrency: int = 8,
+) -> dict[str, Any]:
+    base = _langgraph_base_url()
+    cap = max(1, min(5000, int(max_runs)))
+    statuses = {x.strip().lower() for x in (status or "").split(",") if x.strip()}
+    since_ts = _parse_time_bound("since", since)
+    until_ts = _parse_time_bound("until", until)
+
+    def matches(run: dict[str, Any]) -> bool:
+        created = _iso_seconds(run.get("created_at"))
+        if since_ts is not None and created is not None and created < since_ts:
+            return False
+        if until_ts is not None and created is not None and created > until_ts:
+            return False
+        return not statuses or str(run.get("status") or "").lower() in statuses
+
+    started = time.perf_counter()
+    runs: list[dict[str, Any]] = []
+    pages = 0
+    scanned = 0
+    skipped = 0
+    offset = 0
+    truncated = False
+    while True:
+        url = f"{base}/threads/{thread_id}/runs?limit=100&offset={offset}"
+        if len(statuses) == 1:
+            # Single status: let the server filter so fewer pages cross the wire.
+            url += f"&status={next(iter(statuses))}"
+        page = _http_json("GET", url, None)
+        page = page if isinstance(page, list) else []
+        pages += 1
+        scanned += len(page)
+        offset += len(page)
+        reached_since = False
+        for run in page:
+            if not isinstance(run, dict):
+                skipped += 1
+                continue
+            created = _iso_seconds(run.get("created_at"))
+            if since_ts is not None and created is not None and created < since_ts:
+                reached_since = True
+                continue
+            if not matches(run):
+                continue
+            if len(runs) >= cap:
+                truncated = True
+                break
+            runs.append(run)
+        # Runs come newest first, so once a page dips below `since` nothing older can match.
+        if truncated or reached_since or len(page) < 100:
+            break
+
+    detail_errors: dict[str, str] = {}
+    if details and runs:
+        fetched = _bounded_map(
+            _LANGGRAPH_POOL,
+            lambda run: _http_json("GET", f"{base}/threads/{thread_id}/runs/{run['run_id']}", None),
+            runs,
+            max(1, min(32, int(detail_concurrency))),
+        )
+        refreshed: list[dict[str, Any]] = []
+        for run, got in zip(runs, fetched, strict=True):
+            if not isinstance(got, dict):
+                detail_errors[str(run.get("run_id"))] = str(got)
+                refreshed.append(run)
+            elif matches(got):
+                # The fresh copy may have moved out of the requested statuses since listing.
+                refreshed.append(got)
+        runs = refreshed
+
+    rows = [
+        [
+            run.get("run_id"),
+            run.get("status"),
+            run.get("assistant_id"),
+            run.get("created_at"),
+            run.get("updated_at"),
+            _run_duration_s(run),
+        ]
+        for run in runs
+    ]
+    status_counts: dict[str, int] = {}
+    for run in runs:
+        key = str(run.get("status") or "unknown")
+        status_counts[key] = status_counts.get(key, 0) + 1
+    out: dict[str, Any] = {
+        "thread_id": thread_id,
+        "columns": _RUN_TABLE_COLUMNS,
+        "rows": rows,
+        "count": len(rows),
+        "status_counts": status_counts,
+        "truncated": truncated,
+        "pages": pages,
+        "scanned": scanned,
+        "skipped": skipped,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    if details:
+        # kwargs carries the run input and can be large; the table already has the essentials.
+        out["runs"] = [{k: v for k, v in run.items() if k != "kwargs"} for run in runs]
+        out["detail_errors"] = detail_errors
+    return out
+
+
+@mcp.tool(
+    name="bifrost.health",
+    description=(
+        "Report per-model Bifrost circuit breaker states, models learned to reject temperature, "
+        "and hedged-request counters."
+    ),
+)
+def bifrost_health() -> dict[str, Any]:
+    return _bifrost_health()
+
+
+@mcp.tool(
+    name="sirvist.http_stats",
+    description="Report shared HTTP client counters (requests, new vs reused connections).",
+)
+def sirvist_http_stats() -> dict[str, Any]:
+    return _http_stats()
+
+
 if __name__ == "__main__":
+    if any(ds_id for _, ds_id in _patent_datastores()) and not (
+        _env("SIRVIST_VERTEX_ACCESS_TOKEN") or _env("VERTEX_ACCESS_TOKEN")
+    ):
+        _VERTEX_TOKENS.prefetch()
+    if (local_index := _local_rag_index()) is not None:
+        local_index.refresh_in_background(force=True)
     # Use stdio for maximum compatibility with local clients (Codex, Gemini CLI, etc.).
     mcp.run("stdio")
@@ -0,0 +1,10 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+# The servers are run as scripts, so make `paths` (repo root) and the server modules importable.
+_MCP_DIR = Path(__file__).resolve().parents[1]
+for p in (_MCP_DIR.parent, _MCP_DIR):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
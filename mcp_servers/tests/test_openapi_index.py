@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import openapi_local_mcp_server as oas
+import pytest
+
+_SPEC = {
+    "paths": {
+        "/v1/patents/{id}": {
+            "get": {"operationId": "getPatentById", "summary": "Fetch one", "tags": ["Patents"]},
+            "delete": {"operationId": "deletePatent", "summary": "Remove", "tags": ["Patents"]},
+        },
+        "/v1/claims/19": {
+            "get": {"operationId": "getClaim", "summary": "Claim nineteen", "tags": ["Claims"]},
+        },
+        "/v1/claims/190": {
+            "get": {"operationId": "getClaimRange", "summary": "Claims", "tags": ["Claims"]},
+        },
+        "/v2/search": {
+            "post": {"operationId": "searchPatents", "summary": "Full text", "tags": ["Search"]},
+        },
+    }
+}
+
+
+@pytest.fixture
+def index() -> oas._OperationIndex:
+    return oas._OperationIndex(oas._iter_operations(_SPEC), "digest")
+
+
+def _ids(index: oas._OperationIndex, hits: list[tuple[int, float | None]]) -> list[str]:
+    return [index.ops[i]["operationId"] for i, _ in hits]
+
+
+def test_filters_combine(index: oas._OperationIndex) -> None:
+    assert _ids(index, index.search(method="GET", path_prefix="/v1/claims")) == [
+        "getClaim",
+        "getClaimRange",
+    ]
+    assert _ids(index, index.search(tag="patents", method="delete")) == ["deletePatent"]
+    assert index.search(tag="missing") == []
+
+
+def test_token_search_ranks_exact_above_prefix(index: oas._OperationIndex) -> None:
+    hits = index.search(contains="patent")
+    assert _ids(index, hits)[:2] == ["getPatentById", "deletePatent"]
+    assert "searchPatents" in _ids(index, hits)
+
+
+def test_numeric_tokens_match_exactly(index: oas._OperationIndex) -> None:
+    # "/v1/claims/190" still matches literally, but only "19" scores as a token.
+    (top, top_score), (other, other_score) = index.search(contains="19")
+    assert index.ops[top]["path"] == "/v1/claims/19"
+    assert index.ops[other]["path"] == "/v1/claims/190"
+    assert top_score > other_score
+    assert other_score == 1.0
+
+
+def test_literal_match_stays_inside_one_field(index: oas._OperationIndex) -> None:
+    assert _ids(index, index.search(contains="/v1/pat")) == ["getPatentById", "deletePatent"]
+    # "/v2/search" + "searchPatents" would read "/v2/searchsearch" if fields were concatenated.
+    assert index.search(contains="searchsearch") == []
+    assert index.search(contains="\x00") == [(i, None) for i in range(len(index.ops))]
+
+
+@pytest.mark.parametrize("needle", ["/v1/", "patent", "claims/19", "ch pat", "xyz", "s/{i"])
+def test_trigram_candidates_match_a_full_scan(index: oas._OperationIndex, needle: str) -> None:
+    expected = {i for i, haystack in enumerate(index.haystacks) if needle in haystack}
+    candidates = index._literal_candidates(needle)
+    assert expected <= candidates
+    assert {i for i in candidates if needle in index.haystacks[i]} == expected
@@ -0,0 +1,598 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import queue
+import threading
+import time
+
+import httpx
+import numpy as np
+import pytest
+import sirvist_mcp_server as srv
+
+# --- Neo4j driver ---
+
+
+class _FakeDriver:
+    def __init__(self, uri: str) -> None:
+        self.uri = uri
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def fake_neo4j(monkeypatch: pytest.MonkeyPatch) -> dict[str, str]:
+    settings = {"uri": "bolt://one"}
+    monkeypatch.setattr(
+        srv,
+        "_NEO4J_DRIVER_STATE",
+        {"driver": None, "key": None, "dirty": False, "users": {}, "retired": set()},
+    )
+    base = {
+        "user": "neo4j",
+        "password": "",
+        "max_connection_pool_size": 1,
+        "connection_acquisition_timeout": 1.0,
+        "max_connection_lifetime": 1.0,
+        "liveness_check_timeout": 1.0,
+    }
+    monkeypatch.setattr(srv, "_neo4j_settings", lambda repo_root: {**base, **settings})
+    monkeypatch.setattr(srv.GraphDatabase, "driver", lambda uri, **kwargs: _FakeDriver(uri))
+    return settings
+
+
+def _change_neo4j_uri(settings: dict[str, str], uri: str) -> None:
+    settings["uri"] = uri
+    srv._mark_neo4j_driver_dirty({"NEO4J_URI"})
+
+
+def test_neo4j_driver_swap_waits_for_holders(fake_neo4j: dict[str, str]) -> None:
+    held = srv._hold_neo4j_driver(srv.repo_root)
+    assert srv._neo4j_driver(srv.repo_root) is held
+
+    _change_neo4j_uri(fake_neo4j, "bolt://two")
+    fresh = srv._neo4j_driver(srv.repo_root)
+    assert fresh.uri == "bolt://two"
+    assert not held.closed
+
+    srv._release_neo4j_driver(held)
+    assert held.closed
+
+    # An unheld driver is closed as soon as it is replaced.
+    _change_neo4j_uri(fake_neo4j, "bolt://three")
+    srv._neo4j_driver(srv.repo_root)
+    assert fresh.closed
+
+
+# --- Neo4j cursors ---
+
+
+class _FakeRecord(dict):
+    def data(self) -> dict:
+        return dict(self)
+
+
+class _FakeResult:
+    def __init__(self, rows: list[dict]) -> None:
+        self._rows = [_FakeRecord(r) for r in rows]
+
+    def fetch(self, n: int) -> list[_FakeRecord]:
+        out, self._rows = self._rows[:n], self._rows[n:]
+        return out
+
+    def peek(self) -> _FakeRecord | None:
+        return self._rows[0] if self._rows else None
+
+
+class _FakeSession:
+    def __init__(self) -> None:
+        self.closed = False
+
+    def run(self, query: str, **params) -> _FakeResult:
+        return _FakeResult([{"n": i} for i in range(3)])
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class _FakeSessionDriver(_FakeDriver):
+    def session(self, **kwargs) -> _FakeSession:
+        return _FakeSession()
+
+
+def test_neo4j_cursor_holds_its_driver_until_drained(
+    fake_neo4j: dict[str, str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(srv.GraphDatabase, "driver", lambda uri, **kw: _FakeSessionDriver(uri))
+    monkeypatch.setattr(srv, "_NEO4J_CURSORS", {})
+    page = srv._open_neo4j_cursor("MATCH (n) RETURN n", {}, 2)
+    assert page["has_more"]
+    old = srv._neo4j_driver(srv.repo_root)
+
+    _change_neo4j_uri(fake_neo4j, "bolt://two")
+    srv._neo4j_driver(srv.repo_root)
+    assert not old.closed
+
+    token = page["cursor"]
+    last = srv._neo4j_cursor_page(token, srv._NEO4J_CURSORS[token], 2)
+    assert last["rows"] == [{"n": 2}]
+    assert not last["has_more"]
+    assert old.closed
+
+
+# --- Cypher classification ---
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "MATCH (n) RETURN n LIMIT 5",
+        "CALL db.labels()",
+        "MATCH (n {set: 1}) WHERE n.merge > $delete RETURN n.create",
+        "MATCH (n) WHERE n.name = 'CREATE (x)' RETURN n // DELETE n",
+        "MATCH (n:`DELETE`) RETURN n",
+    ],
+)
+def test_classify_cypher_reads(query: str) -> None:
+    assert srv._classify_cypher(query).kind == "read"
+
+
+@pytest.mark.parametrize(
+    ("query", "reason"),
+    [
+        ("MATCH (n) DETACH DELETE n", "DELETE"),
+        ("MERGE (n:Patent {id: $id})", "MERGE"),
+        ("LOAD CSV FROM 'file:///x.csv' AS row RETURN row", "LOAD"),
+        ("CALL apoc.create.node(['X'], {})", "CALL apoc.create.node"),
+        ("CALL apoc.cypher.doIt('CREATE (n)', {})", "CALL apoc.cypher.doit"),
+        ("CALL apoc.cypher.runWrite('CREATE (n)', {})", "CALL apoc.cypher.runwrite"),
+        ("CALL apoc.periodic.iterate('MATCH (n) RETURN n', 'SET n.x = 1', {})", None),
+        ("CALL custom.proc.doIt('x')", "CALL custom.proc.doit"),
+        ("CALL `apoc.cypher.doIt`('CREATE (n)', {})", "CALL apoc.cypher.doit"),
+        ("CALL `apoc`.`periodic`.iterate('a', 'b', {})", "CALL apoc.periodic.iterate"),
+    ],
+)
+def test_classify_cypher_writes(query: str, reason: str | None) -> None:
+    verdict = srv._classify_cypher(query)
+    assert verdict.kind == "write"
+    if reason is not None:
+        assert verdict.write_reason == reason
+
+
+def test_schema_only_rejects_backticked_write_procedure() -> None:
+    query = (
+        "CALL db.indexes() YIELD name "
+        "CALL `apoc.cypher.doIt`('MATCH (n) DETACH DELETE n', {}) YIELD value RETURN value"
+    )
+    with pytest.raises(ValueError, match="Non-schema writes"):
+        srv._ensure_schema_only(query)
+
+
+def test_classify_cypher_schema_ops() -> None:
+    create = srv._classify_cypher("CREATE INDEX patent_id FOR (p:Patent) ON (p.id)")
+    assert create.kind == "schema"
+    assert create.is_ddl
+    assert create.non_schema_write is None
+    show = srv._classify_cypher("SHOW INDEXES")
+    assert show.kind == "schema"
+    assert not show.is_ddl
+
+
+def test_classify_cypher_limit_and_empty() -> None:
+    assert srv._classify_cypher("MATCH (n) RETURN n LIMIT 10").has_top_level_limit
+    assert not srv._classify_cypher(
+        "MATCH (n) CALL { MATCH (m) RETURN m LIMIT 1 } RETURN n"
+    ).has_top_level_limit
+    assert srv._classify_cypher("  // only a comment").empty
+
+
+# --- Datastore budget split ---
+
+
+@pytest.mark.parametrize(
+    ("max_results", "kinds", "expected"),
+    [
+        (1, ["drafts", "provisional"], [0, 1]),
+        (3, ["drafts", "provisional"], [2, 1]),
+        (4, ["drafts", "provisional"], [2, 2]),
+        (2, ["drafts", "office", "provisional"], [1, 0, 1]),
+        (5, ["drafts", "office", "provisional"], [2, 2, 1]),
+        (1, ["drafts", "office"], [1, 0]),
+    ],
+)
+def test_split_budget(max_results: int, kinds: list[str], expected: list[int]) -> None:
+    budget = srv._split_budget(max_results, kinds)
+    assert budget == expected
+    assert sum(budget) == max_results
+
+
+# --- Caches ---
+
+
+def test_lru_ttl_cache_override_only_shortens(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr(srv.time, "monotonic", lambda: now[0])
+    cache = srv._LruTtlCache(ttl_s=10, max_entries=2)
+    cache.put("short", 1, ttl_s=2)
+    cache.put("long", 2, ttl_s=60)
+    now[0] += 5
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    now[0] += 6
+    assert cache.get("long") is None
+    assert not cache.put("expired", 3, ttl_s=0)
+
+
+def test_tiered_cache_promoted_entry_keeps_remaining_lifetime(
+    tmp_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    disk = srv._SqliteCache(tmp_path / "cache.sqlite", max_bytes=1 << 20, max_age_s=10)
+    writer = srv._TieredCache(memory_entries=4, max_age_s=10, disk=disk)
+    writer.put("k", {"v": 1})
+    assert writer.get("k")[0] == {"v": 1}
+
+    # A fresh process sees only the disk tier; 8s of the 10s lifetime have already passed.
+    reader = srv._TieredCache(memory_entries=4, max_age_s=10, disk=disk)
+    wall, mono = time.time(), time.monotonic()
+    monkeypatch.setattr(srv.time, "time", lambda: wall + 8)
+    value, age = reader.get("k")
+    assert value == {"v": 1}
+    assert age == pytest.approx(8, abs=1)
+
+    monkeypatch.setattr(srv.time, "monotonic", lambda: mono + 3)
+    assert reader.memory.get("k") is None
+
+
+# --- Local hybrid RAG index ---
+
+
+def _fake_embed(texts: list[str]) -> np.ndarray:
+    mat = np.asarray(
+        [[t.count("cathode") + 0.1, t.count("anode") + 0.1] for t in texts], dtype=np.float32
+    )
+    return mat / np.linalg.norm(mat, axis=1, keepdims=True)
+
+
+def _down(texts: list[str]) -> np.ndarray:
+    raise RuntimeError("ollama down")
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    root = tmp_path / "corpus"
+    (root / "drafts").mkdir(parents=True)
+    (root / "notes.md").write_text("# Cathode notes\n\nA cathode coating.", encoding="utf-8")
+    (root / "drafts" / "anode.txt").write_text("An anode binder.", encoding="utf-8")
+    return root
+
+
+def test_local_rag_index_builds_and_filters_by_kind(
+    corpus, tmp_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(srv, "_ollama_embed", _fake_embed)
+    index = srv._LocalRagIndex(corpus, tmp_path / "index")
+    assert index.kinds() == {"local", "drafts"}
+    index._refresh()
+    state = index._state
+    assert state["manifest"]["pending_rows"] == []
+    assert state["vectors"].shape == (2, 2)
+
+    hits, dense = index.search(state, "cathode coating", 5)
+    assert dense
+    assert hits[0]["title"] == "Cathode notes"
+    hits, _ = index.search(state, "cathode coating", 5, {"drafts"})
+    assert [h["source_kind"] for h in hits] == ["drafts"]
+
+
+def test_local_rag_index_retries_pending_embeddings(
+    corpus, tmp_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(srv, "_ollama_embed", _down)
+    index = srv._LocalRagIndex(corpus, tmp_path / "index")
+    index._refresh()
+    state = index._state
+    assert state["manifest"]["pending_rows"] == [0, 1]
+    assert state["vectors"] is None
+    hits, dense = index.search(state, "anode", 5)
+    assert [h["file"] for h in hits] == ["drafts/anode.txt"]
+    assert not dense
+
+    # BM25 keeps serving until the retry window passes; then the pending rows are embedded.
+    monkeypatch.setattr(srv, "_ollama_embed", _fake_embed)
+    index._refresh()
+    assert index._state is state
+    index._embed_retry_at = 0.0
+    index._refresh()
+    assert index._state["manifest"]["pending_rows"] == []
+    assert index._state["vectors"].shape == (2, 2)
+
+
+def test_local_rag_index_restart_reuses_committed_vectors(
+    corpus, tmp_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    embedded: list[str] = []
+
+    def counting_embed(texts: list[str]) -> np.ndarray:
+        embedded.extend(texts)
+        return _fake_embed(texts)
+
+    monkeypatch.setattr(srv, "_ollama_embed", counting_embed)
+    srv._LocalRagIndex(corpus, tmp_path / "index")._refresh()
+    assert len(embedded) == 2
+
+    # Startup refreshes a fresh object before anything called current().
+    embedded.clear()
+    restarted = srv._LocalRagIndex(corpus, tmp_path / "index")
+    restarted._refresh()
+    assert embedded == []
+    assert restarted._state["vectors"].shape == (2, 2)
+
+
+# --- Evidence packet sizing ---
+
+
+def _packet(snippets: list[str]) -> dict:
+    return {
+        "query": "q",
+        "results": [
+            {"doc_id": f"d{i}", "title": f"t{i}", "uri": None, "snippet": s}
+            for i, s in enumerate(snippets)
+        ],
+    }
+
+
+def test_pack_results_leaves_fitting_packet_untouched() -> None:
+    packet = _packet(["short", "also short"])
+    before = json.loads(json.dumps(packet))
+    srv._pack_results(packet, 10_000)
+    assert packet == before
+
+
+def test_pack_results_shares_budget_across_snippets() -> None:
+    packet = _packet(["x" * 500, "y" * 2000])
+    budget = srv._json_len(packet) - 1000
+    srv._pack_results(packet, budget)
+    assert srv._json_len(packet) <= budget
+    short, long = (r["snippet"] for r in packet["results"])
+    assert short.startswith("x") and short.endswith("…")
+    assert long.startswith("y") and long.endswith("…")
+    assert len(long) > len(short)
+
+
+def test_pack_results_no_ellipsis_when_snippets_fit_after_dropping() -> None:
+    packet = _packet(["s" * 5] * 3)
+    for r in packet["results"]:
+        r["title"] = "t" * 200
+    budget = srv._json_len({**packet, "results": packet["results"][:2]})
+    srv._pack_results(packet, budget)
+    assert [r["snippet"] for r in packet["results"]] == ["sssss", "sssss"]
+
+
+def test_pack_results_drops_lowest_ranked_when_metadata_does_not_fit() -> None:
+    packet = _packet(["a" * 50] * 5)
+    budget = srv._json_len({**packet, "results": packet["results"][:2]}) - 40
+    srv._pack_results(packet, budget)
+    assert [r["doc_id"] for r in packet["results"]] == ["d0", "d1"]
+    assert srv._json_len(packet) <= budget
+
+
+# --- Near-duplicate query index ---
+
+
+def _lsh(**kwargs) -> srv._MinHashLsh:
+    opts = {"threshold": 0.9, "bands": 16, "rows": 4, "max_entries": 8, "min_terms": 3}
+    opts.update(kwargs)
+    return srv._MinHashLsh(**opts)
+
+
+def test_minhash_matches_reordered_query() -> None:
+    lsh = _lsh()
+    lsh.add("lithium batteries with a cathode coating", "s", "k1")
+    hits = lsh.lookup("cathode coating for lithium batteries", "s")
+    assert [key for _, key, _ in hits] == ["k1"]
+    assert lsh.lookup("cathode coating for lithium batteries", "other-scope") == []
+
+
+def test_minhash_default_threshold_rejects_substituted_term() -> None:
+    lsh = _lsh()
+    lsh.add("lithium battery cathode coating", "s", "k1")
+    assert lsh.lookup("sodium battery cathode coating", "s") == []
+
+
+@pytest.mark.parametrize(
+    ("stored", "probe"),
+    [
+        (
+            "solid state battery cathode coating binder electrolyte",
+            "solid state battery cathode coating binder electrolyte without",
+        ),
+        (
+            "claim 12 solid state battery cathode coating binder",
+            "claim 13 solid state battery cathode coating binder",
+        ),
+    ],
+)
+def test_minhash_rejects_negation_and_number_changes(stored: str, probe: str) -> None:
+    # Similar enough to pass a loose threshold, but the differing term changes the question.
+    lsh = _lsh(threshold=0.5)
+    lsh.add(stored, "s", "k1")
+    assert lsh.lookup(probe, "s") == []
+
+
+def test_minhash_ignores_short_queries_and_evicts_oldest() -> None:
+    lsh = _lsh(max_entries=2)
+    lsh.add("lithium cathode", "s", "short")
+    assert lsh.lookup("lithium cathode", "s") == []
+    lsh.add("alpha beta gamma", "s", "k1")
+    lsh.add("delta epsilon zeta", "s", "k2")
+    lsh.add("eta theta iota", "s", "k3")
+    assert lsh.lookup("alpha beta gamma", "s") == []
+    assert [key for _, key, _ in lsh.lookup("eta theta iota", "s")] == ["k3"]
+
+
+# --- Bifrost rate limiter ---
+
+
+def test_token_bucket_bursts_then_waits(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [0.0]
+    sleeps: list[float] = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(srv.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(srv.time, "sleep", sleep)
+    bucket = srv._TokenBucket(rate_per_s=2, burst=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert sleeps == []
+    bucket.acquire()
+    assert sleeps == [pytest.approx(0.5)]
+
+
+# --- Bifrost circuit breaker ---
+
+
+def test_circuit_breaker_opens_and_allows_one_probe(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [0.0]
+    monkeypatch.setattr(srv.time, "monotonic", lambda: now[0])
+    breaker = srv._CircuitBreaker(failure_threshold=2, reset_after_s=30)
+    assert not breaker.before("m")
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    with pytest.raises(RuntimeError, match="circuit open"):
+        breaker.before("m")
+
+    now[0] += 31
+    assert breaker.before("m")  # the half-open probe
+    with pytest.raises(RuntimeError, match="probe in flight"):
+        breaker.before("m")
+    breaker.release_probe()
+    assert breaker.before("m")
+    breaker.record_success()
+    assert breaker.snapshot() == {"state": "closed", "failures": 0}
+
+
+def test_circuit_breaker_failed_probe_reopens(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [0.0]
+    monkeypatch.setattr(srv.time, "monotonic", lambda: now[0])
+    breaker = srv._CircuitBreaker(failure_threshold=1, reset_after_s=10)
+    assert breaker.record_failure()
+    now[0] += 11
+    breaker.before("m")
+    assert breaker.record_failure()
+    assert breaker.snapshot() == {"state": "open", "failures": 2, "retry_in_s": 10.0}
+
+
+def test_circuit_breaker_probe_slot_survives_concurrent_callers() -> None:
+    breaker = srv._CircuitBreaker(failure_threshold=1, reset_after_s=0)
+    # Started while the breaker was closed, so it never held the probe.
+    stale_probing = breaker.before("m")
+    breaker.record_failure()
+
+    barrier = threading.Barrier(8)
+    taken: list[bool] = []
+
+    def call() -> None:
+        barrier.wait()
+        try:
+            probing = breaker.before("m")
+        except RuntimeError:
+            return
+        taken.append(probing)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert taken == [True]
+
+    # The stale call finishing (as in the chat paths' finally) must not free the probe slot.
+    if stale_probing:
+        breaker.release_probe()
+    with pytest.raises(RuntimeError, match="probe in flight"):
+        breaker.before("m")
+
+
+# --- Repo config reload ---
+
+
+def test_repo_config_notifies_subscribers_outside_caller_locks(tmp_path) -> None:
+    env_file = tmp_path / ".env"
+    env_file.write_text("SIRVIST_HTTP_MAX_CONNECTIONS=10\n", encoding="utf-8")
+    config = srv._RepoConfig(env_files=[env_file], allowlist_dir=tmp_path, check_interval_s=0)
+    lock = threading.Lock()
+    seen = queue.Queue()
+
+    def retire(changed: set[str]) -> None:
+        with lock:
+            seen.put(changed)
+
+    config.subscribe(("SIRVIST_HTTP_*",), retire)
+    env_file.write_text("SIRVIST_HTTP_MAX_CONNECTIONS=200\n", encoding="utf-8")
+    # Reading config while holding the lock the subscriber needs must not deadlock.
+    with lock:
+        assert config.env()["SIRVIST_HTTP_MAX_CONNECTIONS"] == "200"
+    assert seen.get(timeout=5) == {"SIRVIST_HTTP_MAX_CONNECTIONS"}
+
+
+# --- Shared HTTP client ---
+
+
+@pytest.fixture
+def mock_http_client(monkeypatch: pytest.MonkeyPatch):
+    client = httpx.Client(
+        # An iterator body is not pre-read, so it behaves like a body streamed off the network.
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, content=iter([b"data: 1\n\n"]))
+        )
+    )
+    monkeypatch.setitem(srv._HTTP_CLIENT, "client", client)
+    monkeypatch.setitem(srv._HTTP_CLIENT, "users", {})
+    monkeypatch.setitem(srv._HTTP_CLIENT, "retired", set())
+    return client
+
+
+def test_retired_http_client_outlives_open_streams(mock_http_client: httpx.Client) -> None:
+    first = srv._http_request("POST", "http://upstream/stream", stream=True)
+    second = srv._http_request("POST", "http://upstream/stream", stream=True)
+    srv._retire_http_client({"SIRVIST_HTTP_MAX_CONNECTIONS"})
+    assert not mock_http_client.is_closed
+
+    first.close()
+    assert not mock_http_client.is_closed
+    assert second.read() == b"data: 1\n\n"  # reading to the end closes the response
+    assert mock_http_client.is_closed
+    assert srv._HTTP_CLIENT["users"] == {}
+
+
+def test_idle_http_client_closes_on_retire(mock_http_client: httpx.Client) -> None:
+    assert srv._http_request("GET", "http://upstream/ok").status_code == 200
+    srv._retire_http_client({"SIRVIST_HTTP_MAX_CONNECTIONS"})
+    assert mock_http_client.is_closed
+    assert srv._HTTP_CLIENT["client"] is None
+
+
+# --- LangGraph run tools ---
+
+
+@pytest.mark.parametrize(
+    ("name", "required"),
+    [
+        ("langgraph.runs.create", ["input_json"]),
+        ("langgraph.runs.wait", ["input_json"]),
+        ("langgraph.runs.stream", ["input_json"]),
+        ("langgraph.thread_runs.create", ["thread_id", "input_json"]),
+        ("langgraph.thread_runs.wait", ["thread_id", "input_json"]),
+        ("langgraph.thread_runs.stream", ["thread_id", "input_json"]),
+    ],
+)
+def test_langgraph_run_tools_publish_required_input(name: str, required: list[str]) -> None:
+    tool = asyncio.run(srv.mcp.get_tools())[name]
+    assert tool.parameters["required"] == required
+    assert {"assistant_id", "graph_id"} <= tool.parameters["properties"].keys()
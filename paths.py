@@ -37,3 +37,8 @@ def bifrost_allowlists_dir() -> Path:
 
 def docs_dir() -> Path:
     return path("docs")
+
+
+def state_dir() -> Path:
+    """Repo-local runtime state (logs, caches, indexes); git-ignored."""
+    return path(".sirvist")